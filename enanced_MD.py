@@ -1,16 +1,29 @@
+import io
 import os
 import pandas as pd
 import streamlit as st
-import streamlit.components.v1 as components
-import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from sqlalchemy import create_engine
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial, wraps
 from dotenv import load_dotenv
 import psycopg2
+from adbc_driver_postgresql import dbapi as adbc_dbapi
 import numpy as np
-import json
+import pyarrow as pa
+import orjson
+import inspect
+import hashlib
+import re
+import types
+
+# Serialize figures with orjson (already a dependency) instead of the stdlib json module
+pio.json.config.default_engine = "orjson"
 
 
 # -------------------------------
@@ -39,6 +52,81 @@ FEATURE_COLORS = {
     "investment": "purple",
 }
 
+# Fixed order of the per-feature user counts in the comprehensive metrics row
+FEATURE_KEYS = ("spending_users", "lady_ai_users", "savings_users", "investment_users")
+ONLY_FEATURE_KEYS = tuple(f"only_{key}" for key in FEATURE_KEYS)
+
+# Overview trend chart options: granularity labels, metric columns and line colours
+TREND_AGGREGATION_OPTIONS = {
+    'Day-to-Day': 'day',
+    'Week-to-Week': 'week',
+    'Month-to-Month': 'month'
+}
+TREND_METRIC_COLUMNS = {
+    "Signups": "signups",
+    "Active Users": "active_users",
+    "Absolute Signups": "absolute_signups",
+    "Absolute Active Users": "absolute_active_users",
+    "Lady Users": "lady_users",
+    "Spending Users": "spending_users",
+    "Savings Users": "savings_users",
+    "Investment Users": "investment_users",
+}
+TREND_METRIC_COLORS = {
+    "Signups": LADDER_COLORS["navy"],
+    "Active Users": LADDER_COLORS["azure"],
+    "Absolute Signups": LADDER_COLORS["purple"],
+    "Absolute Active Users": LADDER_COLORS["orange"],
+    "Lady Users": LADDER_COLORS["orange"],
+    "Spending Users": LADDER_COLORS["blue"],
+    "Savings Users": LADDER_COLORS["green"],
+    "Investment Users": LADDER_COLORS["purple"],
+}
+
+# Overview card tiers as (alert level, insight) pairs. A tier index is the sum of a
+# card's threshold comparisons, so each card does one table lookup instead of
+# repeating the same comparison chain for its alert, insight and colour
+TIER_COLORS = ("red", "orange", "green")
+CONVERSION_TIERS = (
+    ("high", "Critical: Improve onboarding flow"),
+    ("medium", "Good: Focus on activation campaigns"),
+    ("low", "Excellent: Maintain current strategy"),
+)
+ADOPTION_TIERS = (
+    ("low", "Focus on user retention"),
+    ("medium", "Balanced user growth"),
+    ("high", "High new user acquisition"),
+)
+# Feature usage as % of active users: (low mark, high mark, tiers below / between / above the marks)
+FEATURE_USAGE_TIERS = {
+    "spending": (20, 40, (
+        ("medium", "Consider spending feature promotion"),
+        ("info", "Normal spending usage"),
+        ("low", "Strong spending engagement"),
+    )),
+    "lady_ai": (10, 30, (
+        ("medium", "Boost Lady AI adoption"),
+        ("info", "Steady AI usage"),
+        ("low", "High AI engagement"),
+    )),
+    "savings": (15, 25, (
+        ("medium", "Promote savings features"),
+        ("info", "Healthy savings usage"),
+        ("low", "Strong savings culture"),
+    )),
+    "investment": (8, 20, (
+        ("medium", "Focus on investment adoption"),
+        ("info", "Growing investment usage"),
+        ("low", "High investment engagement"),
+    )),
+}
+
+
+def feature_usage_tier(feature, pct):
+    """(alert level, insight) for a feature's share of active users"""
+    low, high, tiers = FEATURE_USAGE_TIERS[feature]
+    return tiers[(pct >= low) + (pct > high)]
+
 # -------------------------------
 # Streamlit App Configuration (must be first Streamlit call)
 # -------------------------------
@@ -119,37 +207,173 @@ DB_NAME = os.getenv("DB_NAME")
 
 db_url = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+@st.cache_resource
+def get_engine():
+    """One pooled engine for the whole server, kept across reruns and sessions"""
+    # Recycle pooled connections before server/proxy idle timeouts drop them
+    return create_engine(db_url, pool_size=10, max_overflow=10, pool_pre_ping=True, pool_recycle=1800)
+
+
+def query_fallback(default_factory):
+    """Show a failed fetch's database error and return default_factory() in its place"""
+    # Applied outside the cache decorators, so a failed query is retried on the
+    # next run instead of its fallback being cached like a real result
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except (SQLAlchemyError, psycopg2.Error, adbc_dbapi.Error) as e:
+                st.error(f"Query failed: {e}")
+                return default_factory()
+
+        if hasattr(func, "clear"):
+            wrapper.clear = func.clear
+        return wrapper
+
+    return decorator
+
+
+def run_parallel(*calls, max_workers=8):
+    """Run independent zero-argument callables concurrently and return their results in order"""
+    # Worker threads need the script run context so st.cache_data and st.error keep working
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=max_workers,
+        initializer=add_script_run_ctx,
+        initargs=(None, ctx),
+    ) as executor:
+        futures = [executor.submit(call) for call in calls]
+        return [future.result() for future in futures]
+
+
+def read_sql_copy(connection, query, params=None, parse_dates=None, dtype=None):
+    """Stream a query's rows through COPY ... TO STDOUT and load them with the C CSV parser"""
+    buffer = io.BytesIO()
+    with connection.connection.cursor() as cursor:
+        sql = cursor.mogrify(query, params).decode().strip().rstrip(";")
+        cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", buffer)
+    buffer.seek(0)
+    return pd.read_csv(buffer, parse_dates=parse_dates, dtype=dtype)
+
+
+def prepared_statement(connection, query, params=()):
+    """Prepare a query once per pooled connection and return the EXECUTE statement that runs it"""
+    name = "stmt_" + hashlib.md5(query.encode()).hexdigest()[:16]
+    # The info dict lives with the underlying DBAPI connection, so it survives pool checkouts
+    prepared = connection.connection.info.setdefault("prepared_statements", set())
+    if name not in prepared:
+        positions = iter(range(1, len(params) + 1))
+        body = re.sub(r"%s", lambda _: f"${next(positions)}", query).strip().rstrip(";")
+        connection.exec_driver_sql(f"PREPARE {name} AS {body}")
+        prepared.add(name)
+    placeholders = ", ".join(["%s"] * len(params))
+    return f"EXECUTE {name}({placeholders})" if params else f"EXECUTE {name}"
+
+
+def read_sql_prepared(connection, query, params=()):
+    """Run a query as a server-side prepared statement, preparing it once per pooled connection"""
+    execute = prepared_statement(connection, query, params)
+    return pd.read_sql_query(execute, connection, params=tuple(params))
+
+
+def fetch_row_prepared(connection, query, params=()):
+    """Run a single-row prepared query and return the row as a plain dict, or {} if there is none"""
+    execute = prepared_statement(connection, query, params)
+    row = connection.exec_driver_sql(execute, tuple(params)).mappings().first()
+    return dict(row) if row is not None else {}
+
+
+def cache_by_date_range(func):
+    """Cache a fetcher on disk for ranges that end before today, and for five minutes otherwise"""
+    signature = inspect.signature(func)
+
+    def variant(suffix):
+        # st.cache_data keys its store on the function's qualified name and
+        # source, so each policy gets a renamed copy of the same function
+        copy = types.FunctionType(
+            func.__code__, func.__globals__, func.__name__, func.__defaults__, func.__closure__
+        )
+        copy.__qualname__ = f"{func.__qualname__}_{suffix}"
+        return copy
 
-def get_database_connection():
-    try:
-        conn = create_engine(db_url).connect()
-        return conn
-    except Exception as e:
-        st.error(f"Database connection failed: {e}")
-        return None
+    historical = st.cache_data(persist="disk", max_entries=500)(variant("historical"))
+    live = st.cache_data(ttl=300)(variant("live"))
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        end_date = signature.bind(*args, **kwargs).arguments["end_date"]
+        cached = historical if end_date < datetime.today().date() else live
+        return cached(*args, **kwargs)
+
+    def clear():
+        historical.clear()
+        live.clear()
+
+    wrapper.clear = clear
+    return wrapper
 
 
 # -------------------------------
 # Get FFP data
 # -------------------------------
-@st.cache_data
-def load_ffp_data():
-    """Load FFP data from PostgreSQL"""
-    try:
-        db_url = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-        engine = create_engine(db_url)
-        ffp_df = pd.read_sql("SELECT * FROM financial_simulator_v2", engine)
-        feedback_df = pd.read_sql("SELECT * FROM financial_simulator_reviews", engine)
-        return ffp_df, feedback_df
-    except Exception as e:
-        st.error(f"Failed to load FFP data: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+# Text columns stay Arrow-backed instead of becoming one Python str object per cell;
+# numeric and timestamp columns keep their NumPy dtypes
+ARROW_STRING_TYPES = {
+    pa.string(): pd.StringDtype("pyarrow"),
+    pa.large_string(): pd.StringDtype("pyarrow"),
+}
+
+
+# Rows inside the selected period, in the same [start, end + 1 day) window as fetch_ffp_daily_submissions
+FFP_SUBMISSIONS_QUERY = """
+SELECT created_at, metadata FROM financial_simulator_v2
+WHERE created_at >= $1::date AND created_at < ($2::date + INTERVAL '1 day')
+"""
+FFP_REVIEWS_QUERY = """
+SELECT reaction, comment, created_at FROM financial_simulator_reviews
+WHERE created_at >= $1::date AND created_at < ($2::date + INTERVAL '1 day')
+"""
+
+
+# The FFP tab only reads these frames, so they are held as shared resources
+# and cache hits skip st.cache_data's pickle round-trip
+@query_fallback(lambda: (pd.DataFrame(), pd.DataFrame()))
+@st.cache_resource(ttl=900, max_entries=20, show_spinner=False)
+def load_ffp_data(start_date, end_date):
+    """Load the period's FFP submissions and reviews from PostgreSQL"""
+    # ADBC hands back Arrow record batches, so rows never become Python objects;
+    # only the rows in the period and the columns the FFP tab reads are transferred
+    with adbc_dbapi.connect(db_url) as conn, conn.cursor() as cursor:
+        cursor.execute(FFP_SUBMISSIONS_QUERY, (start_date, end_date))
+        ffp_df = cursor.fetch_arrow_table().to_pandas(types_mapper=ARROW_STRING_TYPES.get)
+        cursor.execute(FFP_REVIEWS_QUERY, (start_date, end_date))
+        feedback_df = cursor.fetch_arrow_table().to_pandas(types_mapper=ARROW_STRING_TYPES.get)
+
+    # Timestamp columns normally arrive as datetime64 from Arrow already; the cast
+    # only does work for text columns and now runs once per cache load, not per rerun
+    ffp_df["created_at"] = pd.to_datetime(ffp_df["created_at"], format="ISO8601", cache=True)
+    if not feedback_df.empty:
+        feedback_df["created_at"] = pd.to_datetime(feedback_df["created_at"], format="ISO8601", cache=True)
+
+    # Parse the metadata once per cache load so reruns only read the counts;
+    # one column per question lets the emptiness checks run column-wise
+    answers = pd.DataFrame.from_records(
+        # to_numpy() converts the Arrow-backed column to str objects in one pass, so
+        # the comprehension does not box each element from the Arrow array separately
+        [parse_ffp_metadata(m) for m in ffp_df["metadata"].to_numpy(dtype=object, na_value=None)],
+        index=ffp_df.index,
+    )
+    answered = answers.notna() & ~answers.astype(str).isin(["", "[]", "{}"])
+    ffp_df["answered_questions"] = answered.sum(axis=1).astype("int64")
+    # The raw JSON is no longer needed once counted, so it is not kept in the cache
+    return ffp_df.drop(columns="metadata"), feedback_df
 
 
 def parse_ffp_metadata(metadata_str):
     """Parse FFP metadata JSON"""
     try:
-        parsed = json.loads(metadata_str)
+        parsed = orjson.loads(metadata_str)
         if isinstance(parsed, dict) and "plan" in parsed:
             return {
                 item["question"]: item["answer"]
@@ -161,56 +385,39 @@ def parse_ffp_metadata(metadata_str):
     return {}
 
 
+@query_fallback(partial(pd.DataFrame, columns=["Date", "Submissions"]))
+@cache_by_date_range
+def fetch_ffp_daily_submissions(start_date, end_date):
+    """Daily FFP submission counts within the period, grouped in the database"""
+    query = """
+    SELECT created_at::date AS "Date", COUNT(*) AS "Submissions"
+    FROM financial_simulator_v2
+    WHERE created_at >= %s::date AND created_at < (%s::date + INTERVAL '1 day')
+    GROUP BY 1
+    ORDER BY 1;
+    """
+
+    with get_engine().connect() as connection:
+        df = read_sql_prepared(connection, query, (start_date, end_date))
+    return df
+
+
 # -------------------------------
 # Enhanced Styling Functions
 # -------------------------------
-def create_metric_card(
-    title,
-    value,
-    help_text,
-    color_key="navy",
-    icon="📊",
-    change_value=None,
-    change_direction="up",
-    alert_level=None,
-    additional_insight=None,
-):
-    color = LADDER_COLORS[color_key]
-
-    # Change indicator
-    change_html = ""
-    if change_value is not None:
-        change_color = "#2ECC71" if change_direction == "up" else "#E74C3C"
-        change_arrow = "↗️" if change_direction == "up" else "↘️"
-        change_html = f'<div style="font-size: 12px; color: {change_color}; margin-top: 5px;">{change_arrow} {change_value}</div>'
-    
-    # Alert level indicator
-    alert_html = ""
-    if alert_level:
-        alert_colors = {
-            "high": "#E74C3C",    # Red for high attention needed
-            "medium": "#F39C12",  # Orange for medium attention
-            "low": "#2ECC71",     # Green for good performance
-            "info": "#3498DB"     # Blue for informational
-        }
-        alert_icons = {
-            "high": "🚨",
-            "medium": "⚠️", 
-            "low": "✅",
-            "info": "ℹ️"
-        }
-        alert_color = alert_colors.get(alert_level, "#3498DB")
-        alert_icon = alert_icons.get(alert_level, "ℹ️")
-        alert_html = f'<div style="font-size: 14px; color: {alert_color}; margin-top: 3px;">{alert_icon}</div>'
-    
-    # Additional insight
-    insight_html = ""
-    if additional_insight:
-        insight_html = f'<div style="font-size: 10px; opacity: 0.9; margin-top: 3px; font-style: italic;">💡 {additional_insight}</div>'
+# Card markup is assembled once with the static palette colours filled in;
+# each call only formats the per-card values into it. The builders are pure
+# functions of their (string/number) arguments, so repeat reruns hit lru_cache.
+ALERT_STYLES = {
+    "high": ("#E74C3C", "🚨"),    # Red for high attention needed
+    "medium": ("#F39C12", "⚠️"),  # Orange for medium attention
+    "low": ("#2ECC71", "✅"),     # Green for good performance
+    "info": ("#3498DB", "ℹ️"),    # Blue for informational
+}
 
-    return f"""
+METRIC_CARD_TEMPLATE = f"""
     <div style="
-        background: linear-gradient(135deg, {color}ee, {color});
+        background: linear-gradient(135deg, {{color}}ee, {{color}});
         padding: 20px;
         border-radius: 15px;
         text-align: center;
@@ -220,19 +427,26 @@ def create_metric_card(
         border-left: 5px solid {LADDER_COLORS['yellow']};
         transition: transform 0.2s ease;
     ">
-        <div style="font-size: 24px; margin-bottom: 5px;">{icon}</div>
-        <div style="font-size: 14px; opacity: 0.9; margin-bottom: 8px;">{title}</div>
-        <div style="font-size: 28px; font-weight: bold; margin-bottom: 5px;">{value}</div>
-        <div style="font-size: 11px; opacity: 0.8;">{help_text}</div>
-        {change_html}
-        {alert_html}
-        {insight_html}
+        <div style="font-size: 24px; margin-bottom: 5px;">{{icon}}</div>
+        <div style="font-size: 14px; opacity: 0.9; margin-bottom: 8px;">{{title}}</div>
+        <div style="font-size: 28px; font-weight: bold; margin-bottom: 5px;">{{value}}</div>
+        <div style="font-size: 11px; opacity: 0.8;">{{help_text}}</div>
+        {{change_html}}
+        {{alert_html}}
+        {{insight_html}}
     </div>
     """
 
+# Optional metric card sections, filled only when the card has them
+CHANGE_TEMPLATE = '<div style="font-size: 12px; color: {color}; margin-top: 5px;">{arrow} {value}</div>'
+ALERT_TEMPLATE = '<div style="font-size: 14px; color: {color}; margin-top: 3px;">{icon}</div>'
+CARD_INSIGHT_TEMPLATE = '<div style="font-size: 10px; opacity: 0.9; margin-top: 3px; font-style: italic;">💡 {insight}</div>'
+CHANGE_STYLES = {
+    "up": ("#2ECC71", "↗️"),
+    "down": ("#E74C3C", "↘️"),
+}
 
-def create_insight_card(title, insight, recommendation, icon="💡"):
-    return f"""
+INSIGHT_CARD_TEMPLATE = f"""
     <div style="
         background: linear-gradient(135deg, {LADDER_COLORS['white']}, {LADDER_COLORS['light_gray']});
         padding: 20px;
@@ -242,18 +456,98 @@ def create_insight_card(title, insight, recommendation, icon="💡"):
         border-left: 5px solid {LADDER_COLORS['orange']};
     ">
         <div style="display: flex; align-items: center; margin-bottom: 10px;">
-            <span style="font-size: 24px; margin-right: 10px;">{icon}</span>
-            <h4 style="color: {LADDER_COLORS['navy']}; margin: 0;">{title}</h4>
+            <span style="font-size: 24px; margin-right: 10px;">{{icon}}</span>
+            <h4 style="color: {LADDER_COLORS['navy']}; margin: 0;">{{title}}</h4>
         </div>
-        <p style="color: {LADDER_COLORS['dark_gray']}; margin-bottom: 10px; font-size: 14px;">{insight}</p>
-        <p style="color: {LADDER_COLORS['orange']}; margin: 0; font-weight: bold; font-size: 13px;">💡 Recommendation: {recommendation}</p>
+        <p style="color: {LADDER_COLORS['dark_gray']}; margin-bottom: 10px; font-size: 14px;">{{insight}}</p>
+        <p style="color: {LADDER_COLORS['orange']}; margin: 0; font-weight: bold; font-size: 13px;">💡 Recommendation: {{recommendation}}</p>
     </div>
     """
 
 
-def apply_custom_css():
+@lru_cache(maxsize=512)
+def create_metric_card(
+    title,
+    value,
+    help_text,
+    color_key="navy",
+    icon="📊",
+    change_value=None,
+    change_direction="up",
+    alert_level=None,
+    additional_insight=None,
+):
+    # Change indicator
+    change_html = ""
+    if change_value is not None:
+        change_color, change_arrow = CHANGE_STYLES["up" if change_direction == "up" else "down"]
+        change_html = CHANGE_TEMPLATE.format(color=change_color, arrow=change_arrow, value=change_value)
+    
+    # Alert level indicator
+    alert_html = ""
+    if alert_level:
+        alert_color, alert_icon = ALERT_STYLES.get(alert_level, ALERT_STYLES["info"])
+        alert_html = ALERT_TEMPLATE.format(color=alert_color, icon=alert_icon)
+    
+    # Additional insight
+    insight_html = ""
+    if additional_insight:
+        insight_html = CARD_INSIGHT_TEMPLATE.format(insight=additional_insight)
+
+    return METRIC_CARD_TEMPLATE.format_map(
+        {
+            "color": LADDER_COLORS[color_key],
+            "icon": icon,
+            "title": title,
+            "value": value,
+            "help_text": help_text,
+            "change_html": change_html,
+            "alert_html": alert_html,
+            "insight_html": insight_html,
+        }
+    )
+
+
+@lru_cache(maxsize=512)
+def create_insight_card(title, insight, recommendation, icon="💡"):
+    return INSIGHT_CARD_TEMPLATE.format(
+        title=title, insight=insight, recommendation=recommendation, icon=icon
+    )
+
+
+def render_metric_row(cards):
+    """Lay out a row of metric cards (card HTML or create_metric_card argument tuples) as one flex element"""
+    # One markdown element per row instead of an st.columns block plus one element per card.
+    # Blank lines (left by empty optional sections) would end the HTML block, so drop them.
+    cells = "".join(
+        '<div style="flex: 1 1 0; min-width: 160px;">'
+        + "\n".join(
+            line
+            for line in (card if isinstance(card, str) else create_metric_card(*card)).splitlines()
+            if line.strip()
+        )
+        + "</div>"
+        for card in cards
+    )
     st.markdown(
-        f"""
+        f'<div style="display: flex; flex-wrap: wrap; gap: 12px;">{cells}</div>',
+        unsafe_allow_html=True,
+    )
+
+
+def render_insight_cards(insights):
+    """Emit a list of insight dicts as one st.markdown element instead of one per card"""
+    # Cards are stripped so the joined HTML stays one block, not an indented code block
+    st.markdown(
+        "\n".join(create_insight_card(**insight).strip() for insight in insights),
+        unsafe_allow_html=True,
+    )
+
+
+@st.cache_resource
+def custom_css():
+    """The app stylesheet with the palette filled in, built once per process"""
+    return f"""
     <style>
     .main {{
         background: linear-gradient(135deg, {LADDER_COLORS['light_gray']}, {LADDER_COLORS['white']});
@@ -272,15 +566,6 @@ def apply_custom_css():
         color: {LADDER_COLORS['navy']};
     }}
     
-    .feature-section {{
-        background: white;
-        padding: 20px;
-        border-radius: 15px;
-        margin: 15px 0;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-        border-left: 4px solid {LADDER_COLORS['orange']};
-    }}
-    
     .stTabs [data-baseweb="tab-list"] {{
         gap: 8px;
     }}
@@ -297,68 +582,178 @@ def apply_custom_css():
         color: white;
     }}
     </style>
+    """
+
+
+def apply_custom_css():
+    # Streamlit drops elements that a rerun does not emit again, so the
+    # stylesheet is re-sent each run; only building the string is cached
+    st.markdown(custom_css(), unsafe_allow_html=True)
+
+
+# -------------------------------
+# Shared Activity Definitions
+# -------------------------------
+# Per-feature activity as (user_id, activity_date) rows, each SELECT bounded by
+# one start/end date pair. Every per-feature fetcher reads from these so the
+# definitions live in one place instead of being re-declared per query.
+FEATURE_ACTIVITY_QUERIES = {
+    "spending": """
+        SELECT user_id::TEXT, created_at::date AS activity_date
+        FROM budgets WHERE created_at >= %s::date AND created_at < (%s::date + INTERVAL '1 day')
+        UNION ALL
+        SELECT user_id::TEXT, created_at::date
+        FROM manual_and_external_transactions WHERE created_at >= %s::date AND created_at < (%s::date + INTERVAL '1 day')
     """,
-        unsafe_allow_html=True,
-    )
+    "savings": """
+        SELECT p.user_id::TEXT, t.updated_at::date AS activity_date
+        FROM transactions t
+        JOIN plans p ON p.id = t.plan_id
+        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND t.updated_at >= %s::date AND t.updated_at < (%s::date + INTERVAL '1 day')
+    """,
+    "investment": """
+        SELECT ip.user_id::TEXT, t.updated_at::date AS activity_date
+        FROM transactions t
+        JOIN investment_plans ip ON ip.id = t.investment_plan_id
+        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND t.updated_at >= %s::date AND t.updated_at < (%s::date + INTERVAL '1 day')
+    """,
+    "lady_ai": """
+        SELECT "user"::TEXT AS user_id, created_at::date AS activity_date
+        FROM slack_message_dump WHERE created_at >= %s::date AND created_at < (%s::date + INTERVAL '1 day')
+    """,
+}
+
+# Savings and investment activity from a single scan of transactions: each successful
+# transaction yields a row for the investment plan and/or the savings plan it funds,
+# exactly as the two per-feature joins above do
+TRANSACTION_ACTIVITY_QUERY = """
+        SELECT plan.user_id, t.updated_at::date AS activity_date, plan.feature
+        FROM transactions t
+        LEFT JOIN investment_plans ip ON ip.id = t.investment_plan_id
+        LEFT JOIN plans p ON p.id = t.plan_id
+        CROSS JOIN LATERAL (
+            VALUES (ip.user_id::TEXT, 'investment'), (p.user_id::TEXT, 'savings')
+        ) AS plan(user_id, feature)
+        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND t.updated_at >= %s::date AND t.updated_at < (%s::date + INTERVAL '1 day')
+          AND plan.user_id IS NOT NULL
+"""
+
+# Activity across every feature
+ALL_ACTIVITY_QUERY = "\n        UNION ALL\n".join(
+    [
+        FEATURE_ACTIVITY_QUERIES["spending"],
+        f"SELECT user_id, activity_date FROM ({TRANSACTION_ACTIVITY_QUERY}) AS transaction_activity",
+        FEATURE_ACTIVITY_QUERIES["lady_ai"],
+    ]
+)
+
+# Every feature event before a cutoff date as (user_id, activity_date, feature)
+# rows. The cutoff is compared against the raw timestamps inside each branch, so
+# the created_at / updated_at indexes serve it instead of a filter on a ::date cast
+FEATURE_HISTORY_QUERY = """
+        -- Spending
+        SELECT user_id::TEXT, created_at::date AS activity_date, 'spending' AS feature
+        FROM budgets WHERE created_at < %s::date
+        UNION ALL
+        SELECT user_id::TEXT, created_at::date, 'spending'
+        FROM manual_and_external_transactions WHERE created_at < %s::date
+        UNION ALL
+        -- Investment and savings, from one scan of transactions
+        SELECT plan.user_id, t.updated_at::date, plan.feature
+        FROM transactions t
+        LEFT JOIN investment_plans ip ON ip.id = t.investment_plan_id
+        LEFT JOIN plans p ON p.id = t.plan_id
+        CROSS JOIN LATERAL (
+            VALUES (ip.user_id::TEXT, 'investment'), (p.user_id::TEXT, 'savings')
+        ) AS plan(user_id, feature)
+        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND t.updated_at < %s::date
+          AND plan.user_id IS NOT NULL
+        UNION ALL
+        -- Lady AI
+        SELECT "user"::TEXT, created_at::date, 'lady_ai'
+        FROM slack_message_dump WHERE created_at < %s::date
+"""
+
+
+def feature_history_query(before_date):
+    """Return the all-time feature events SQL for activity before before_date, with the params it binds"""
+    return FEATURE_HISTORY_QUERY, [before_date] * FEATURE_HISTORY_QUERY.count("%s")
+
+
+def feature_activity_query(start_date, end_date, feature=None):
+    """Return the activity SQL for a feature (or all features) with the date params it binds"""
+    query = FEATURE_ACTIVITY_QUERIES[feature] if feature else ALL_ACTIVITY_QUERY
+    return query, [start_date, end_date] * (query.count("%s") // 2)
+
+
+# Activity across every feature, tagged with the feature it came from, so the
+# per-feature tabs can be served by one query grouped by feature
+LABELED_ACTIVITY_QUERY = "\n        UNION ALL\n".join(
+    [
+        f"SELECT '{feature}' AS feature, user_id, activity_date FROM ({FEATURE_ACTIVITY_QUERIES[feature]}) AS {feature}_activity"
+        for feature in ("spending", "lady_ai")
+    ]
+    + [f"SELECT feature, user_id, activity_date FROM ({TRANSACTION_ACTIVITY_QUERY}) AS transaction_activity"]
+)
+
+
+def labeled_activity_query(start_date, end_date):
+    """Return the feature-tagged activity SQL with the date params it binds"""
+    return LABELED_ACTIVITY_QUERY, [start_date, end_date] * (LABELED_ACTIVITY_QUERY.count("%s") // 2)
+
+
+# Every feature as a VALUES list, so features without activity still get a row
+FEATURE_VALUES = ", ".join(f"('{feature}')" for feature in FEATURE_ACTIVITY_QUERIES)
+
+
+def feature_slice(df, feature):
+    """Return one feature's rows from a batched per-feature frame, indexed from 0"""
+    if df.empty:
+        return df
+    return df.loc[df["feature"] == feature].drop(columns="feature").reset_index(drop=True)
 
 
 # -------------------------------
 # Enhanced Query Functions
 # -------------------------------
-@st.cache_data(ttl=300)
+@query_fallback(dict)
+@cache_by_date_range
 def fetch_comprehensive_metrics(start_date, end_date):
-    conn = get_database_connection()
-    if conn is None:
-        return pd.DataFrame()
+    activity_query, activity_params = labeled_activity_query(start_date, end_date)
+    history_query, history_params = feature_history_query(start_date)
 
-    query = """
+    query = f"""
    WITH users_filtered AS (
-    SELECT id::TEXT AS user_id, DATE(created_at) AS signup_date
+    SELECT id::TEXT AS user_id, created_at::date AS signup_date
     FROM users
     WHERE restricted = false
     ),
 
-    all_feature_usage AS (
-        -- Spending
-        SELECT user_id::TEXT, DATE(created_at) AS activity_date, 'spending' AS feature
-        FROM budgets
-        UNION
-        SELECT user_id::TEXT, DATE(created_at), 'spending'
-        FROM manual_and_external_transactions
-        UNION
-        -- Investment
-        SELECT ip.user_id::TEXT, DATE(t.updated_at), 'investment'
-        FROM transactions t
-        JOIN investment_plans ip ON ip.id = t.investment_plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar'
-        UNION
-        -- Savings
-        SELECT p.user_id::TEXT, DATE(t.updated_at), 'savings'
-        FROM transactions t
-        JOIN plans p ON p.id = t.plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar'
-        UNION
-        -- Lady AI
-        SELECT "user"::TEXT, DATE(created_at), 'lady_ai'
-        FROM slack_message_dump
+    -- The selected period's activity, bounded inside each branch and shared by every period metric below
+    period_usage AS MATERIALIZED (
+        {activity_query}
     ),
 
-    -- Step 1: Each user’s earliest feature usage ever (across all time)
-    first_ever_activity AS (
-        SELECT user_id, MIN(activity_date) AS first_ever_activity_date
-        FROM all_feature_usage
-        GROUP BY user_id
+    -- Step 1: Users with any feature usage before the period. A user active in the
+    -- period is a first-time user exactly when they are not in this set, so the
+    -- lifetime MIN(activity_date) per user is never needed
+    prior_users AS (
+        SELECT DISTINCT user_id
+        FROM (
+            {history_query}
+        ) AS history
     ),
 
-    -- Step 2: Each user’s activity summary within the selected period
+    -- Step 2: Each user’s activity summary and feature mix within the selected period
     user_activity_summary AS (
         SELECT 
             user_id,
             COUNT(DISTINCT activity_date) AS active_days_in_period,
             MIN(activity_date) AS first_activity_in_period,
-            MAX(activity_date) AS last_activity_in_period
-        FROM all_feature_usage
-        WHERE activity_date BETWEEN %s AND %s
+            MAX(activity_date) AS last_activity_in_period,
+            COUNT(DISTINCT feature) AS feature_count,
+            MAX(feature) AS only_feature
+        FROM period_usage
         GROUP BY user_id
     ),
 
@@ -367,7 +762,6 @@ def fetch_comprehensive_metrics(start_date, end_date):
         SELECT 
             uas.user_id,
             uf.signup_date,
-            fea.first_ever_activity_date,
             uas.first_activity_in_period,
             uas.active_days_in_period,
             CASE
@@ -375,486 +769,443 @@ def fetch_comprehensive_metrics(start_date, end_date):
                 WHEN uas.active_days_in_period >= 2 THEN 'recurring'
                 ELSE 'inactive'
             END AS usage_type,
-            CASE
-                WHEN fea.first_ever_activity_date BETWEEN %s AND %s THEN TRUE
-                ELSE FALSE
-            END AS is_first_time_user
+            pu.user_id IS NULL AS is_first_time_user
         FROM user_activity_summary uas
         JOIN users_filtered uf ON uf.user_id = uas.user_id
-        LEFT JOIN first_ever_activity fea ON fea.user_id = uas.user_id
+        LEFT JOIN prior_users pu ON pu.user_id = uas.user_id
+    ),
+    classification_counts AS (
+        SELECT
+            COUNT(*) AS total_active_users,
+            COUNT(*) FILTER (WHERE usage_type = 'one_time_usage') AS one_time_usage_users,
+            COUNT(*) FILTER (WHERE usage_type = 'recurring') AS recurring_users,
+            COUNT(*) FILTER (WHERE is_first_time_user) AS first_time_users
+        FROM user_classification
     ),
 
-    -- Step 4: DAU, WAU, MAU metrics
-    dau_metrics AS (
-        SELECT AVG(daily_count) AS avg_dau
-        FROM (
-            SELECT activity_date, COUNT(DISTINCT user_id) AS daily_count
-            FROM all_feature_usage
-            WHERE activity_date BETWEEN %s AND %s
-            GROUP BY activity_date
-        ) d
+    -- Step 4: DAU, WAU, MAU from one grouped pass over the period
+    window_counts AS (
+        SELECT
+            GROUPING(activity_date) = 0 AS is_day,
+            GROUPING(DATE_TRUNC('week', activity_date)) = 0 AS is_week,
+            COUNT(DISTINCT user_id) AS active_users
+        FROM period_usage
+        GROUP BY GROUPING SETS (
+            (activity_date),
+            (DATE_TRUNC('week', activity_date)),
+            (DATE_TRUNC('month', activity_date))
+        )
     ),
-    wau_metrics AS (
-        SELECT AVG(weekly_count) AS avg_wau
-        FROM (
-            SELECT DATE_TRUNC('week', activity_date)::DATE AS week, COUNT(DISTINCT user_id) AS weekly_count
-            FROM all_feature_usage
-            WHERE activity_date BETWEEN %s AND %s
-            GROUP BY 1
-        ) w
+    engagement_metrics AS (
+        SELECT
+            COALESCE(AVG(active_users) FILTER (WHERE is_day), 0)::FLOAT AS avg_dau,
+            COALESCE(AVG(active_users) FILTER (WHERE is_week), 0)::FLOAT AS avg_wau,
+            COALESCE(AVG(active_users) FILTER (WHERE NOT is_day AND NOT is_week), 0)::FLOAT AS avg_mau
+        FROM window_counts
     ),
-    mau_metrics AS (
-        SELECT AVG(monthly_count) AS avg_mau
-        FROM (
-            SELECT DATE_TRUNC('month', activity_date)::DATE AS month, COUNT(DISTINCT user_id) AS monthly_count
-            FROM all_feature_usage
-            WHERE activity_date BETWEEN %s AND %s
-            GROUP BY 1
-        ) m
+
+    -- Step 5: Feature-level usage in one pass over the period's activity
+    feature_metrics AS (
+        SELECT
+            COUNT(DISTINCT user_id) FILTER (WHERE feature = 'spending') AS spending_users,
+            COUNT(DISTINCT user_id) FILTER (WHERE feature = 'savings') AS savings_users,
+            COUNT(DISTINCT user_id) FILTER (WHERE feature = 'investment') AS investment_users,
+            COUNT(DISTINCT user_id) FILTER (WHERE feature = 'lady_ai') AS lady_ai_users
+        FROM period_usage
+    ),
+
+    -- Step 6: Single vs multiple feature users, from the per-user rollup
+    feature_mix AS (
+        SELECT
+            COUNT(*) FILTER (WHERE feature_count = 1) AS single_feature_users,
+            COUNT(*) FILTER (WHERE feature_count > 1) AS multiple_feature_users,
+            COUNT(*) FILTER (WHERE feature_count = 1 AND only_feature = 'spending') AS only_spending_users,
+            COUNT(*) FILTER (WHERE feature_count = 1 AND only_feature = 'savings') AS only_savings_users,
+            COUNT(*) FILTER (WHERE feature_count = 1 AND only_feature = 'investment') AS only_investment_users,
+            COUNT(*) FILTER (WHERE feature_count = 1 AND only_feature = 'lady_ai') AS only_lady_ai_users
+        FROM user_activity_summary
     )
     SELECT
     -- Core user metrics
-        (SELECT COUNT(*) FROM users WHERE restricted = false AND DATE(created_at) BETWEEN %s AND %s) AS total_signups,
-        (SELECT COUNT(DISTINCT user_id) FROM user_classification) AS total_active_users,
-        (SELECT COUNT(*) FROM user_classification WHERE usage_type = 'one_time_usage') AS one_time_usage_users,
-        (SELECT COUNT(*) FROM user_classification WHERE usage_type = 'recurring') AS recurring_users,
-        (SELECT COUNT(*) FROM user_classification WHERE is_first_time_user = TRUE) AS first_time_users,
+        (SELECT COUNT(*) FROM users WHERE restricted = false AND created_at >= %s::date AND created_at < (%s::date + INTERVAL '1 day')) AS total_signups,
+        cc.total_active_users,
+        cc.one_time_usage_users,
+        cc.recurring_users,
+        cc.first_time_users,
         
         -- Engagement
-        (SELECT avg_dau FROM dau_metrics) AS avg_dau,
-        (SELECT avg_wau FROM wau_metrics) AS avg_wau,
-        (SELECT avg_mau FROM mau_metrics) AS avg_mau,
+        em.avg_dau,
+        em.avg_wau,
+        em.avg_mau,
  
         -- Feature-level usage
-        (SELECT COUNT(DISTINCT user_id) FROM all_feature_usage WHERE feature = 'spending' AND activity_date BETWEEN %s AND %s) AS spending_users,
-        (SELECT COUNT(DISTINCT user_id) FROM all_feature_usage WHERE feature = 'savings' AND activity_date BETWEEN %s AND %s) AS savings_users,
-        (SELECT COUNT(DISTINCT user_id) FROM all_feature_usage WHERE feature = 'investment' AND activity_date BETWEEN %s AND %s) AS investment_users,
-        (SELECT COUNT(DISTINCT user_id) FROM all_feature_usage WHERE feature = 'lady_ai' AND activity_date BETWEEN %s AND %s) AS lady_ai_users,
-        (SELECT COUNT(*) FROM (
-            SELECT user_id, COUNT(DISTINCT feature) as feature_count
-            FROM all_feature_usage 
-            WHERE activity_date BETWEEN %s AND %s
-            GROUP BY user_id
-            HAVING COUNT(DISTINCT feature) = 1
-        ) single_feature) AS single_feature_users,
-        (SELECT COUNT(*) FROM (
-            SELECT user_id, COUNT(DISTINCT feature) as feature_count
-            FROM all_feature_usage 
-            WHERE activity_date BETWEEN %s AND %s
-            GROUP BY user_id
-            HAVING COUNT(DISTINCT feature) > 1
-        ) multi_feature) AS multiple_feature_users,
+        fm.spending_users,
+        fm.savings_users,
+        fm.investment_users,
+        fm.lady_ai_users,
+        mix.single_feature_users,
+        mix.multiple_feature_users,
         
         -- Single feature users (users who use only one specific feature)
-        (SELECT COUNT(*) FROM (
-            SELECT user_id
-            FROM all_feature_usage 
-            WHERE activity_date BETWEEN %s AND %s
-            GROUP BY user_id
-            HAVING COUNT(DISTINCT feature) = 1 AND MAX(feature) = 'spending'
-        ) single_spending) AS only_spending_users,
-        (SELECT COUNT(*) FROM (
-            SELECT user_id
-            FROM all_feature_usage 
-            WHERE activity_date BETWEEN %s AND %s
-            GROUP BY user_id
-            HAVING COUNT(DISTINCT feature) = 1 AND MAX(feature) = 'savings'
-        ) single_savings) AS only_savings_users,
-        (SELECT COUNT(*) FROM (
-            SELECT user_id
-            FROM all_feature_usage 
-            WHERE activity_date BETWEEN %s AND %s
-            GROUP BY user_id
-            HAVING COUNT(DISTINCT feature) = 1 AND MAX(feature) = 'investment'
-        ) single_investment) AS only_investment_users,
-        (SELECT COUNT(*) FROM (
-            SELECT user_id
-            FROM all_feature_usage 
-            WHERE activity_date BETWEEN %s AND %s
-            GROUP BY user_id
-            HAVING COUNT(DISTINCT feature) = 1 AND MAX(feature) = 'lady_ai'
-        ) single_lady_ai) AS only_lady_ai_users;
+        mix.only_spending_users,
+        mix.only_savings_users,
+        mix.only_investment_users,
+        mix.only_lady_ai_users
+    FROM feature_metrics fm
+    CROSS JOIN feature_mix mix
+    CROSS JOIN classification_counts cc
+    CROSS JOIN engagement_metrics em;
     """
 
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        params = [start_date, end_date] * 16  # Added 4 more for single feature specific users
-        df = pd.read_sql_query(query, connection, params=tuple(params))
-        return df
+    with get_engine().connect() as connection:
+        params = activity_params + history_params + [start_date, end_date]
+        return fetch_row_prepared(connection, query, params)
 
 
-@st.cache_data(ttl=300)
-def fetch_feature_combinations(start_date, end_date):
-    """Fetch feature combinations for multiple feature users"""
-    conn = get_database_connection()
-    if conn is None:
-        return pd.DataFrame()
+@cache_by_date_range
+def fetch_month_activity(start_date, end_date):
+    """Distinct (feature, user_id, activity_date) rows for one chunk (at most a calendar month) of period activity"""
+    activity_query, activity_params = labeled_activity_query(start_date, end_date)
+    query = f"""
+    SELECT DISTINCT feature, user_id, activity_date
+    FROM (
+        {activity_query}
+    ) AS activity
+    """
 
-    query = """
-    WITH all_feature_usage AS (
-        -- Spending
-        SELECT user_id::TEXT, DATE(created_at) AS activity_date, 'spending' AS feature
-        FROM budgets
-        UNION
-        SELECT user_id::TEXT, DATE(created_at), 'spending'
-        FROM manual_and_external_transactions
-        UNION
-        -- Investment
-        SELECT ip.user_id::TEXT, DATE(t.updated_at), 'investment'
-        FROM transactions t
-        JOIN investment_plans ip ON ip.id = t.investment_plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar'
-        UNION
-        -- Savings
-        SELECT p.user_id::TEXT, DATE(t.updated_at), 'savings'
-        FROM transactions t
-        JOIN plans p ON p.id = t.plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar'
-        UNION
-        -- Lady AI
-        SELECT "user"::TEXT, DATE(created_at), 'lady_ai'
-        FROM slack_message_dump
-    ),
-    
-    user_features AS (
-        SELECT 
-            user_id,
-            STRING_AGG(DISTINCT feature, ' + ' ORDER BY feature) AS feature_combination,
-            COUNT(DISTINCT feature) AS feature_count
-        FROM all_feature_usage
-        WHERE activity_date BETWEEN %s AND %s
-        GROUP BY user_id
-        HAVING COUNT(DISTINCT feature) > 1
+    with get_engine().connect() as connection:
+        return read_sql_copy(
+            connection,
+            query,
+            tuple(activity_params),
+            parse_dates=["activity_date"],
+            # user_id is pinned to text: left to inference, a month whose ids all look
+            # numeric would load as int64 and stop matching the other months' ids
+            dtype={"feature": "string[pyarrow]", "user_id": "string[pyarrow]"},
+        )
+
+
+# The raw activity frame is the largest cached value and is only read, never mutated,
+# so it is held as a shared resource: cache hits skip st.cache_data's pickle round-trip
+@st.cache_resource(ttl=300, max_entries=20, show_spinner=False)
+def fetch_period_activity(start_date, end_date):
+    """Distinct (feature, user_id, activity_date) rows for the period, shared by the metrics derived in pandas"""
+    # The range is fetched one calendar month at a time. Months the range covers
+    # completely are cached on their own (on disk once they are over), so overlapping
+    # and sliding ranges reuse them; the first and last chunks are clamped to the range
+    # so a short range across a month boundary does not read two whole months
+    months = pd.date_range(pd.Timestamp(start_date).replace(day=1), end_date, freq="MS")
+    if start_date > end_date or months.empty:
+        return pd.DataFrame(
+            {
+                "feature": pd.Series(dtype="string[pyarrow]"),
+                "user_id": pd.Series(dtype="string[pyarrow]"),
+                "activity_date": pd.Series(dtype="datetime64[ns]"),
+            }
+        )
+    return pd.concat(
+        run_parallel(
+            *(
+                partial(
+                    fetch_month_activity,
+                    max(month.date(), start_date),
+                    min((month + pd.offsets.MonthEnd(0)).date(), end_date),
+                )
+                for month in months
+            )
+        ),
+        ignore_index=True,
     )
-    
-    SELECT 
-        feature_combination,
-        COUNT(*) AS user_count,
-        ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER(), 2) AS percentage
-    FROM user_features
-    GROUP BY feature_combination
-    ORDER BY user_count DESC;
-    """
 
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        df = pd.read_sql_query(query, connection, params=(start_date, end_date))
-        return df
 
+@query_fallback(pd.DataFrame)
+@cache_by_date_range
+def fetch_feature_combinations(start_date, end_date):
+    """Fetch feature combinations for multiple feature users"""
+    activity = fetch_period_activity(start_date, end_date)
+    if activity.empty:
+        return pd.DataFrame()
 
-@st.cache_data(ttl=300)
-def fetch_feature_specific_metrics(start_date, end_date, feature):
-    conn = get_database_connection()
-    if conn is None:
+    # Each user's distinct features in name order, joined the way STRING_AGG(... ORDER BY feature) did
+    user_features = (
+        activity[["user_id", "feature"]]
+        .drop_duplicates()
+        .sort_values(["user_id", "feature"])
+        .groupby("user_id")["feature"]
+        .agg(" + ".join)
+    )
+    multi_feature = user_features[user_features.str.contains(" + ", regex=False)]
+    if multi_feature.empty:
         return pd.DataFrame()
 
-    feature_queries = {
-        "spending": """
-            SELECT user_id::TEXT, DATE(created_at) AS activity_date
-            FROM budgets WHERE DATE(created_at) BETWEEN %s AND %s
-            UNION
-            SELECT user_id::TEXT, DATE(created_at)
-            FROM manual_and_external_transactions WHERE DATE(created_at) BETWEEN %s AND %s
-        """,
-        "savings": """
-            SELECT p.user_id::TEXT, DATE(t.updated_at) AS activity_date
-            FROM transactions t
-            JOIN plans p ON p.id = t.plan_id
-            WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-        """,
-        "investment": """
-            SELECT ip.user_id::TEXT, DATE(t.updated_at) AS activity_date
-            FROM transactions t
-            JOIN investment_plans ip ON ip.id = t.investment_plan_id
-            WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-        """,
-        "lady_ai": """
-            SELECT "user"::TEXT AS user_id, DATE(created_at) AS activity_date
-            FROM slack_message_dump WHERE DATE(created_at) BETWEEN %s AND %s
-        """,
-    }
+    df = multi_feature.value_counts().rename_axis("feature_combination").reset_index(name="user_count")
+    df["percentage"] = (df["user_count"] * 100.0 / df["user_count"].sum()).round(2)
+    return df
 
-    if feature not in feature_queries:
-        return pd.DataFrame()
 
-    base_query = feature_queries[feature]
+@query_fallback(pd.DataFrame)
+@cache_by_date_range
+def fetch_all_feature_metrics(start_date, end_date):
+    """Per-feature usage metrics for every feature tab, one row per feature"""
+    activity_query, activity_params = labeled_activity_query(start_date, end_date)
 
     query = f"""
     WITH users_filtered AS (
-        SELECT id::TEXT AS user_id, DATE(created_at) AS signup_date
+        SELECT id::TEXT AS user_id, created_at::date AS signup_date
         FROM users
-        WHERE DATE(created_at) BETWEEN %s AND %s
+        WHERE created_at >= %s::date AND created_at < (%s::date + INTERVAL '1 day')
           AND restricted = false
     ),
     
-    feature_usage AS (
-        {base_query}
-    ),
-    
-    user_first_activity AS (
-        SELECT user_id, MIN(activity_date) AS first_activity_date
-        FROM feature_usage
-        GROUP BY user_id
-    ),
-    
-    first_time_users AS (
-        SELECT uf.user_id
-        FROM users_filtered uf
-        JOIN user_first_activity ufa ON uf.user_id = ufa.user_id
-        WHERE ufa.first_activity_date >= uf.signup_date
+    feature_usage AS MATERIALIZED (
+        {activity_query}
     ),
     
-    recurring_users AS (
-        SELECT user_id
+    -- One row per active user and feature carries everything the user-level counts need
+    user_activity AS (
+        SELECT feature, user_id, MIN(activity_date) AS first_activity_date, COUNT(DISTINCT activity_date) AS active_days
         FROM feature_usage
-        GROUP BY user_id
-        HAVING COUNT(DISTINCT activity_date) > 1
+        GROUP BY feature, user_id
     ),
     
-    dau AS (
-        SELECT activity_date, COUNT(DISTINCT user_id) AS dau
-        FROM feature_usage
-        GROUP BY activity_date
+    user_stats AS (
+        SELECT
+            ua.feature,
+            COUNT(*) AS total_active_users,
+            COUNT(*) FILTER (WHERE ua.first_activity_date >= uf.signup_date) AS first_time_users,
+            COUNT(*) FILTER (WHERE ua.active_days > 1) AS recurring_users
+        FROM user_activity ua
+        LEFT JOIN users_filtered uf ON uf.user_id = ua.user_id
+        GROUP BY ua.feature
     ),
     
-    wau AS (
-        SELECT DATE_TRUNC('week', activity_date)::DATE AS week, COUNT(DISTINCT user_id) AS wau
+    -- Daily, weekly and monthly active users per feature from one grouped pass
+    window_counts AS (
+        SELECT
+            feature,
+            GROUPING(activity_date) = 0 AS is_day,
+            GROUPING(DATE_TRUNC('week', activity_date)) = 0 AS is_week,
+            COUNT(DISTINCT user_id) AS active_users
         FROM feature_usage
-        GROUP BY 1
+        GROUP BY GROUPING SETS (
+            (feature, activity_date),
+            (feature, DATE_TRUNC('week', activity_date)),
+            (feature, DATE_TRUNC('month', activity_date))
+        )
     ),
     
-    mau AS (
-        SELECT DATE_TRUNC('month', activity_date)::DATE AS month, COUNT(DISTINCT user_id) AS mau
-        FROM feature_usage
-        GROUP BY 1
+    engagement AS (
+        SELECT
+            feature,
+            AVG(active_users) FILTER (WHERE is_day) AS avg_dau,
+            AVG(active_users) FILTER (WHERE is_week) AS avg_wau,
+            AVG(active_users) FILTER (WHERE NOT is_day AND NOT is_week) AS avg_mau
+        FROM window_counts
+        GROUP BY feature
     )
     
     SELECT
-        (SELECT COUNT(DISTINCT user_id) FROM feature_usage) AS total_active_users,
-        (SELECT COUNT(*) FROM first_time_users) AS first_time_users,
-        (SELECT COUNT(*) FROM recurring_users) AS recurring_users,
-        (SELECT AVG(dau) FROM dau) AS avg_dau,
-        (SELECT AVG(wau) FROM wau) AS avg_wau,
-        (SELECT AVG(mau) FROM mau) AS avg_mau;
+        f.feature,
+        COALESCE(us.total_active_users, 0) AS total_active_users,
+        COALESCE(us.first_time_users, 0) AS first_time_users,
+        COALESCE(us.recurring_users, 0) AS recurring_users,
+        e.avg_dau,
+        e.avg_wau,
+        e.avg_mau
+    FROM (VALUES {FEATURE_VALUES}) AS f(feature)
+    LEFT JOIN user_stats us ON us.feature = f.feature
+    LEFT JOIN engagement e ON e.feature = f.feature;
     """
 
-    params_count = 2 if feature in ["savings", "investment", "lady_ai"] else 4
-    params = [start_date, end_date] + [start_date, end_date] * (params_count // 2)
+    params = [start_date, end_date] + activity_params
 
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        df = pd.read_sql_query(query, connection, params=tuple(params))
+    with get_engine().connect() as connection:
+        df = read_sql_prepared(connection, query, tuple(params))
     return df
 
 
-@st.cache_data(ttl=300)
+@query_fallback(dict)
+@cache_by_date_range
 def fetch_retention_metrics(start_date, end_date, feature=None):
-    conn = get_database_connection()
-    if conn is None:
-        return pd.DataFrame()
-
-    if feature:
-        feature_queries = {
-            "spending": """
-                SELECT user_id::TEXT, DATE(created_at) AS activity_date
-                FROM budgets WHERE DATE(created_at) BETWEEN %s AND %s
-                UNION
-                SELECT user_id::TEXT, DATE(created_at)
-                FROM manual_and_external_transactions WHERE DATE(created_at) BETWEEN %s AND %s
-            """,
-            "savings": """
-                SELECT p.user_id::TEXT, DATE(t.updated_at) AS activity_date
-                FROM transactions t
-                JOIN plans p ON p.id = t.plan_id
-                WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-            """,
-            "investment": """
-                SELECT ip.user_id::TEXT, DATE(t.updated_at) AS activity_date
-                FROM transactions t
-                JOIN investment_plans ip ON ip.id = t.investment_plan_id
-                WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-            """,
-            "lady_ai": """
-                SELECT "user"::TEXT AS user_id, DATE(created_at) AS activity_date
-                FROM slack_message_dump WHERE DATE(created_at) BETWEEN %s AND %s
-            """,
-        }
-        activity_query = feature_queries[feature]
-    else:
-        activity_query = """
-            SELECT user_id::TEXT, DATE(created_at) AS activity_date
-            FROM budgets WHERE DATE(created_at) BETWEEN %s AND %s
-            UNION
-            SELECT user_id::TEXT, DATE(created_at)
-            FROM manual_and_external_transactions WHERE DATE(created_at) BETWEEN %s AND %s
-            UNION
-            SELECT ip.user_id::TEXT, DATE(t.updated_at)
-            FROM transactions t
-            JOIN investment_plans ip ON ip.id = t.investment_plan_id
-            WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-            UNION
-            SELECT p.user_id::TEXT, DATE(t.updated_at)
-            FROM transactions t
-            JOIN plans p ON p.id = t.plan_id
-            WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-            UNION
-            SELECT "user"::TEXT, DATE(created_at)
-            FROM slack_message_dump WHERE DATE(created_at) BETWEEN %s AND %s
-        """
+    activity_query, activity_params = feature_activity_query(start_date, end_date, feature)
 
     query = f"""
     WITH signups AS (
-        SELECT id::TEXT AS user_id, DATE(created_at) AS signup_date
+        SELECT id::TEXT AS user_id, created_at::date AS signup_date
         FROM users
-        WHERE DATE(created_at) BETWEEN %s AND %s
+        WHERE created_at >= %s::date AND created_at < (%s::date + INTERVAL '1 day')
           AND restricted = false
     ),
     activity AS (
         {activity_query}
     ),
-    joined AS (
-        SELECT s.user_id, s.signup_date, a.activity_date
+    -- One row per signup: signup ids are unique, so plain counts replace
+    -- COUNT(DISTINCT) and only activity inside the 30-day window is joined
+    retained AS (
+        SELECT
+            s.user_id,
+            BOOL_OR(a.activity_date = s.signup_date + 1) AS day1,
+            BOOL_OR(a.activity_date <= s.signup_date + 7) AS week1,
+            BOOL_OR(a.activity_date IS NOT NULL) AS month1
         FROM signups s
-        LEFT JOIN activity a ON s.user_id = a.user_id
+        LEFT JOIN activity a
+          ON s.user_id = a.user_id
+         AND a.activity_date BETWEEN s.signup_date + 1 AND s.signup_date + 30
+        GROUP BY s.user_id
     )
     SELECT
-        COUNT(DISTINCT user_id) AS total_signups,
+        COUNT(*) AS total_signups,
         
         -- Day 1 Retention
-        COUNT(DISTINCT user_id) FILTER (WHERE activity_date = signup_date + INTERVAL '1 day')
-        ::FLOAT / NULLIF(COUNT(DISTINCT user_id), 0) AS day1_retention,
+        COALESCE(COUNT(*) FILTER (WHERE day1)::FLOAT / NULLIF(COUNT(*), 0), 0) * 100 AS day1_pct,
         
         -- Week 1 Retention
-        COUNT(DISTINCT user_id) FILTER (WHERE activity_date BETWEEN signup_date + INTERVAL '1 day' AND signup_date + INTERVAL '7 days')
-        ::FLOAT / NULLIF(COUNT(DISTINCT user_id), 0) AS week1_retention,
+        COALESCE(COUNT(*) FILTER (WHERE week1)::FLOAT / NULLIF(COUNT(*), 0), 0) * 100 AS week1_pct,
         
         -- Month 1 Retention
-        COUNT(DISTINCT user_id) FILTER (WHERE activity_date BETWEEN signup_date + INTERVAL '1 day' AND signup_date + INTERVAL '30 days')
-        ::FLOAT / NULLIF(COUNT(DISTINCT user_id), 0) AS month1_retention
-    FROM joined;
+        COALESCE(COUNT(*) FILTER (WHERE month1)::FLOAT / NULLIF(COUNT(*), 0), 0) * 100 AS month1_pct
+    FROM retained;
     """
 
-    if feature:
-        params_count = 2 if feature in ["savings", "investment", "lady_ai"] else 4
-        params = [start_date, end_date] + [start_date, end_date] * (params_count // 2)
-    else:
-        params = [start_date, end_date] * 6
+    params = [start_date, end_date] + activity_params
 
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        df = pd.read_sql_query(query, connection, params=tuple(params))
-    return df
+    with get_engine().connect() as connection:
+        return fetch_row_prepared(connection, query, params)
 
 
-@st.cache_data(ttl=300)
-def fetch_trend_data(start_date, end_date, feature=None):
-    conn = get_database_connection()
-    if conn is None:
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-
-    if feature:
-        feature_queries = {
-            "spending": """
-                SELECT user_id::TEXT, DATE(created_at) AS activity_date
-                FROM budgets WHERE DATE(created_at) BETWEEN %s AND %s
-                UNION
-                SELECT user_id::TEXT, DATE(created_at)
-                FROM manual_and_external_transactions WHERE DATE(created_at) BETWEEN %s AND %s
-            """,
-            "savings": """
-                SELECT p.user_id::TEXT, DATE(t.updated_at) AS activity_date
-                FROM transactions t
-                JOIN plans p ON p.id = t.plan_id
-                WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-            """,
-            "investment": """
-                SELECT ip.user_id::TEXT, DATE(t.updated_at) AS activity_date
-                FROM transactions t
-                JOIN investment_plans ip ON ip.id = t.investment_plan_id
-                WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-            """,
-            "lady_ai": """
-                SELECT "user"::TEXT AS user_id, DATE(created_at) AS activity_date
-                FROM slack_message_dump WHERE DATE(created_at) BETWEEN %s AND %s
-            """,
-        }
-        base_query = feature_queries[feature]
-    else:
-        base_query = """
-            SELECT user_id::TEXT, DATE(created_at) AS activity_date
-            FROM budgets WHERE DATE(created_at) BETWEEN %s AND %s
-            UNION
-            SELECT user_id::TEXT, DATE(created_at)
-            FROM manual_and_external_transactions WHERE DATE(created_at) BETWEEN %s AND %s
-            UNION
-            SELECT ip.user_id::TEXT, DATE(t.updated_at)
-            FROM transactions t
-            JOIN investment_plans ip ON ip.id = t.investment_plan_id
-            WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-            UNION
-            SELECT p.user_id::TEXT, DATE(t.updated_at)
-            FROM transactions t
-            JOIN plans p ON p.id = t.plan_id
-            WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-            UNION
-            SELECT "user"::TEXT, DATE(created_at)
-            FROM slack_message_dump WHERE DATE(created_at) BETWEEN %s AND %s
-        """
-
-    dau_query = f"""
-        SELECT activity_date, COUNT(DISTINCT user_id) AS dau
-        FROM ({base_query}) fu
-        GROUP BY activity_date
-        ORDER BY activity_date;
-    """
+@query_fallback(pd.DataFrame)
+@cache_by_date_range
+def fetch_all_feature_retention(start_date, end_date):
+    """Day 1 / week 1 / month 1 retention of the period's signups for every feature, one row per feature"""
+    activity_query, activity_params = labeled_activity_query(start_date, end_date)
 
-    wau_query = f"""
-        SELECT DATE_TRUNC('week', activity_date)::DATE AS week, COUNT(DISTINCT user_id) AS wau
-        FROM ({base_query}) fu
-        GROUP BY 1
-        ORDER BY 1;
+    query = f"""
+    WITH signups AS (
+        SELECT id::TEXT AS user_id, created_at::date AS signup_date
+        FROM users
+        WHERE created_at >= %s::date AND created_at < (%s::date + INTERVAL '1 day')
+          AND restricted = false
+    ),
+    activity AS (
+        {activity_query}
+    ),
+    -- One row per signup and feature, joining only activity inside the 30-day window
+    retained AS (
+        SELECT
+            f.feature,
+            s.user_id,
+            BOOL_OR(a.activity_date = s.signup_date + 1) AS day1,
+            BOOL_OR(a.activity_date <= s.signup_date + 7) AS week1,
+            BOOL_OR(a.activity_date IS NOT NULL) AS month1
+        FROM signups s
+        CROSS JOIN (VALUES {FEATURE_VALUES}) AS f(feature)
+        LEFT JOIN activity a
+          ON a.feature = f.feature
+         AND s.user_id = a.user_id
+         AND a.activity_date BETWEEN s.signup_date + 1 AND s.signup_date + 30
+        GROUP BY f.feature, s.user_id
+    )
+    SELECT
+        f.feature,
+        COUNT(r.user_id) AS total_signups,
+        COALESCE(COUNT(*) FILTER (WHERE r.day1)::FLOAT / NULLIF(COUNT(r.user_id), 0), 0) * 100 AS day1_pct,
+        COALESCE(COUNT(*) FILTER (WHERE r.week1)::FLOAT / NULLIF(COUNT(r.user_id), 0), 0) * 100 AS week1_pct,
+        COALESCE(COUNT(*) FILTER (WHERE r.month1)::FLOAT / NULLIF(COUNT(r.user_id), 0), 0) * 100 AS month1_pct
+    FROM (VALUES {FEATURE_VALUES}) AS f(feature)
+    LEFT JOIN retained r ON r.feature = f.feature
+    GROUP BY f.feature;
     """
 
-    mau_query = f"""
-        SELECT DATE_TRUNC('month', activity_date)::DATE AS month, COUNT(DISTINCT user_id) AS mau
-        FROM ({base_query}) fu
-        GROUP BY 1
-        ORDER BY 1;
-    """
+    params = [start_date, end_date] + activity_params
+
+    with get_engine().connect() as connection:
+        df = read_sql_prepared(connection, query, tuple(params))
+    return df
+
+
+@query_fallback(pd.DataFrame)
+@cache_by_date_range
+def fetch_trend_data(start_date, end_date):
+    """Long-form DAU/WAU/MAU series for every feature; split per feature with split_trend_buckets"""
+    activity = fetch_period_activity(start_date, end_date)
+    if activity.empty:
+        return pd.DataFrame()
+
+    # DAU, WAU and MAU for all features come from the cached period activity;
+    # `bucket` and `feature` tell the series apart. Weeks start on Monday like DATE_TRUNC('week')
+    dates = activity["activity_date"]
+    periods = {
+        "day": dates,
+        "week": dates.dt.to_period("W-SUN").dt.start_time,
+        "month": dates.dt.to_period("M").dt.start_time,
+    }
+    return (
+        pd.concat(
+            [
+                activity.assign(bucket=bucket, period=period)
+                .groupby(["bucket", "feature", "period"], as_index=False)["user_id"]
+                .nunique()
+                for bucket, period in periods.items()
+            ],
+            ignore_index=True,
+        )
+        .rename(columns={"user_id": "active_users"})
+    )
 
-    if feature:
-        params_count = 2 if feature in ["savings", "investment", "lady_ai"] else 4
-        params = [start_date, end_date] * (params_count // 2)
-    else:
-        params = [start_date, end_date] * 5
 
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        dau_df = pd.read_sql_query(dau_query, connection, params=tuple(params))
-        wau_df = pd.read_sql_query(wau_query, connection, params=tuple(params))
-        mau_df = pd.read_sql_query(mau_query, connection, params=tuple(params))
+def split_trend_buckets(trend_df, feature):
+    """Split one feature's rows of the long-form trend frame into its DAU, WAU and MAU frames"""
+    trend_df = feature_slice(trend_df, feature)
 
-    return dau_df, wau_df, mau_df
+    def _bucket(name, period_col, count_col):
+        if trend_df.empty:
+            return pd.DataFrame()
+        return (
+            trend_df.loc[trend_df["bucket"] == name, ["period", "active_users"]]
+            .rename(columns={"period": period_col, "active_users": count_col})
+            .reset_index(drop=True)
+        )
+
+    return _bucket("day", "activity_date", "dau"), _bucket("week", "week", "wau"), _bucket("month", "month", "mau")
+
+
+def downsample_lttb(x, y, n_out=2000):
+    """Largest-Triangle-Three-Buckets: keep n_out points that preserve the shape of a long series"""
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+
+    # Triangle areas need numeric x; dates are measured in nanoseconds
+    xs = x.astype("datetime64[ns]").astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x.astype(float)
+    ys = y.astype(float)
+
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    anchor = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = xs[end:next_end].mean(), ys[end:next_end].mean()
+        # Pick the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs(
+            (xs[anchor] - avg_x) * (ys[start:end] - ys[anchor])
+            - (xs[anchor] - xs[start:end]) * (avg_y - ys[anchor])
+        )
+        anchor = start + int(area.argmax())
+        selected[i + 1] = anchor
+
+    return x[selected], y[selected]
 
 
 # -------------------------------
 # Overview Trend and Churn Helpers
 # -------------------------------
-@st.cache_data(ttl=300)
-def fetch_overview_trend(start_date, end_date, aggregation='day'):
-    """
-    Trend for signups, active users, Lady AI users, and spending users within the selected period.
-    Also includes absolute (cumulative from inception) metrics.
-    
-    Args:
-        start_date: Start date for the period
-        end_date: End date for the period
-        aggregation: 'day', 'week', or 'month' - determines the granularity of the trend
-    """
-    conn = get_database_connection()
-    if conn is None:
-        return pd.DataFrame()
-
+@lru_cache(maxsize=None)
+def overview_trend_query(aggregation):
+    """Overview trend SQL for one granularity, formatted once per process and reused by every call"""
     # Determine date truncation based on aggregation
     if aggregation == 'month':
         date_trunc = "DATE_TRUNC('month', {})::date"
@@ -866,541 +1217,366 @@ def fetch_overview_trend(start_date, end_date, aggregation='day'):
         date_trunc = "{}"
         interval = "interval '1 day'"
 
-    query = f"""
+    return f"""
     WITH days AS (
         SELECT generate_series(%s::date, %s::date, {interval})::date AS dt
     ),
-    signups AS (
-        SELECT {date_trunc.format('DATE(created_at)')} AS dt, COUNT(*) AS signups
+    -- Signups per period from inception; the period's own signups and the running
+    -- total both come from this one scan of users
+    signup_counts AS (
+        SELECT
+            {date_trunc.format('created_at::date')} AS dt,
+            COUNT(*) FILTER (WHERE created_at >= %s::date) AS signups,
+            COUNT(*) AS new_signups
         FROM users
-        WHERE restricted = false AND DATE(created_at) BETWEEN %s AND %s
+        WHERE restricted = false AND created_at < (%s::date + INTERVAL '1 day')
         GROUP BY 1
     ),
-    -- Absolute signups: cumulative from inception to each date
-    absolute_signups AS (
-        SELECT {date_trunc.format('DATE(created_at)')} AS dt, COUNT(*) AS absolute_signups
-        FROM users
-        WHERE restricted = false AND DATE(created_at) <= %s
-        GROUP BY 1
-    ),
-    absolute_signups_cumulative AS (
-        SELECT 
+    signups_cumulative AS (
+        SELECT
             dt,
-            SUM(absolute_signups) OVER (ORDER BY dt) AS absolute_signups
-        FROM absolute_signups
+            signups,
+            SUM(new_signups) OVER (ORDER BY dt) AS absolute_signups
+        FROM signup_counts
     ),
-    all_feature_usage AS (
+    -- All feature usage from inception; the period's activity is read back out of it
+    -- below instead of scanning the five source tables a second time
+    all_feature_usage_absolute AS MATERIALIZED (
         -- Spending
-        SELECT user_id::TEXT AS user_id, DATE(created_at) AS activity_date, 'spending' AS feature
-        FROM budgets WHERE DATE(created_at) BETWEEN %s AND %s
+        SELECT user_id::TEXT AS user_id, created_at::date AS activity_date, 'spending' AS feature
+        FROM budgets WHERE created_at < (%s::date + INTERVAL '1 day')
         UNION ALL
-        SELECT user_id::TEXT, DATE(created_at), 'spending'
-        FROM manual_and_external_transactions WHERE DATE(created_at) BETWEEN %s AND %s
+        SELECT user_id::TEXT, created_at::date, 'spending'
+        FROM manual_and_external_transactions WHERE created_at < (%s::date + INTERVAL '1 day')
         UNION ALL
-        -- Investment
-        SELECT ip.user_id::TEXT, DATE(t.updated_at), 'investment'
+        -- Investment and savings, from one scan of transactions
+        SELECT plan.user_id, t.updated_at::date, plan.feature
         FROM transactions t
-        JOIN investment_plans ip ON ip.id = t.investment_plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
-        UNION ALL
-        -- Savings
-        SELECT p.user_id::TEXT, DATE(t.updated_at), 'savings'
-        FROM transactions t
-        JOIN plans p ON p.id = t.plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) BETWEEN %s AND %s
+        LEFT JOIN investment_plans ip ON ip.id = t.investment_plan_id
+        LEFT JOIN plans p ON p.id = t.plan_id
+        CROSS JOIN LATERAL (
+            VALUES (ip.user_id::TEXT, 'investment'), (p.user_id::TEXT, 'savings')
+        ) AS plan(user_id, feature)
+        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND t.updated_at < (%s::date + INTERVAL '1 day')
+          AND plan.user_id IS NOT NULL
         UNION ALL
         -- Lady AI
-        SELECT "user"::TEXT, DATE(created_at), 'lady_ai'
-        FROM slack_message_dump WHERE DATE(created_at) BETWEEN %s AND %s
-    ),
-    -- All feature usage from inception for absolute active users
-    all_feature_usage_absolute AS (
-        -- Spending
-        SELECT user_id::TEXT AS user_id, DATE(created_at) AS activity_date, 'spending' AS feature
-        FROM budgets WHERE DATE(created_at) <= %s
-        UNION ALL
-        SELECT user_id::TEXT, DATE(created_at), 'spending'
-        FROM manual_and_external_transactions WHERE DATE(created_at) <= %s
-        UNION ALL
-        -- Investment
-        SELECT ip.user_id::TEXT, DATE(t.updated_at), 'investment'
-        FROM transactions t
-        JOIN investment_plans ip ON ip.id = t.investment_plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) <= %s
-        UNION ALL
-        -- Savings
-        SELECT p.user_id::TEXT, DATE(t.updated_at), 'savings'
-        FROM transactions t
-        JOIN plans p ON p.id = t.plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) <= %s
-        UNION ALL
-        -- Lady AI
-        SELECT "user"::TEXT, DATE(created_at), 'lady_ai'
-        FROM slack_message_dump WHERE DATE(created_at) <= %s
-    ),
-    aggregated_usage AS (
-        SELECT 
-            {date_trunc.format('activity_date')} AS dt,
-            user_id,
-            feature
-        FROM all_feature_usage
-        GROUP BY 1, 2, 3
-    ),
-    -- Absolute active users: count distinct users who have been active up to each date
-    aggregated_usage_absolute AS (
-        SELECT 
-            {date_trunc.format('activity_date')} AS dt,
-            user_id,
-            feature
-        FROM all_feature_usage_absolute
-        GROUP BY 1, 2, 3
-    ),
-    absolute_active AS (
-        SELECT 
-            dt,
-            COUNT(DISTINCT user_id) AS absolute_active_users
-        FROM (
-            SELECT dt, user_id
-            FROM aggregated_usage_absolute
-            GROUP BY dt, user_id
-        ) subq
-        GROUP BY dt
-    ),
-    absolute_active_cumulative AS (
-        SELECT 
-            dt,
-            (SELECT COUNT(DISTINCT user_id) 
-             FROM aggregated_usage_absolute aua 
-             WHERE aua.dt <= aa.dt) AS absolute_active_users
-        FROM absolute_active aa
+        SELECT "user"::TEXT, created_at::date, 'lady_ai'
+        FROM slack_message_dump WHERE created_at < (%s::date + INTERVAL '1 day')
     ),
-    active AS (
-        SELECT dt, COUNT(DISTINCT user_id) AS active_users
-        FROM aggregated_usage
-        GROUP BY 1
+    aggregated_usage AS (
+        SELECT DISTINCT
+            {date_trunc.format('activity_date')} AS dt,
+            user_id,
+            feature
+        FROM all_feature_usage_absolute
+        WHERE activity_date >= %s::date
     ),
-    lady AS (
-        SELECT dt, COUNT(DISTINCT user_id) AS lady_users
-        FROM aggregated_usage
-        WHERE feature = 'lady_ai'
-        GROUP BY 1
+    -- Absolute active users: a user counts from the period of their first activity
+    -- onwards, so the cumulative distinct count is a running sum of first appearances
+    first_activity AS (
+        SELECT user_id, {date_trunc.format('MIN(activity_date)')} AS dt
+        FROM all_feature_usage_absolute
+        GROUP BY user_id
     ),
-    spending AS (
-        SELECT dt, COUNT(DISTINCT user_id) AS spending_users
-        FROM aggregated_usage
-        WHERE feature = 'spending'
-        GROUP BY 1
+    new_active AS (
+        SELECT dt, COUNT(*) AS new_users
+        FROM first_activity
+        GROUP BY dt
     ),
-    savings AS (
-        SELECT dt, COUNT(DISTINCT user_id) AS savings_users
-        FROM aggregated_usage
-        WHERE feature = 'savings'
-        GROUP BY 1
+    -- Reported only for periods with activity, as before
+    active_periods AS (
+        SELECT DISTINCT {date_trunc.format('activity_date')} AS dt
+        FROM all_feature_usage_absolute
+    ),
+    absolute_active_cumulative AS (
+        SELECT
+            ap.dt,
+            SUM(COALESCE(na.new_users, 0)) OVER (ORDER BY ap.dt) AS absolute_active_users
+        FROM active_periods ap
+        LEFT JOIN new_active na ON na.dt = ap.dt
     ),
-    investment AS (
-        SELECT dt, COUNT(DISTINCT user_id) AS investment_users
+    -- Every per-period count in one pass over aggregated_usage
+    per_feature_counts AS (
+        SELECT
+            dt,
+            COUNT(DISTINCT user_id) AS active_users,
+            COUNT(DISTINCT user_id) FILTER (WHERE feature = 'lady_ai') AS lady_users,
+            COUNT(DISTINCT user_id) FILTER (WHERE feature = 'spending') AS spending_users,
+            COUNT(DISTINCT user_id) FILTER (WHERE feature = 'savings') AS savings_users,
+            COUNT(DISTINCT user_id) FILTER (WHERE feature = 'investment') AS investment_users
         FROM aggregated_usage
-        WHERE feature = 'investment'
         GROUP BY 1
     )
     SELECT 
         d.dt AS activity_date,
-        COALESCE(s.signups, 0) AS signups,
-        COALESCE(a.active_users, 0) AS active_users,
-        COALESCE(l.lady_users, 0) AS lady_users,
-        COALESCE(sp.spending_users, 0) AS spending_users,
-        COALESCE(sv.savings_users, 0) AS savings_users,
-        COALESCE(iv.investment_users, 0) AS investment_users,
-        COALESCE(abs_s.absolute_signups, 0) AS absolute_signups,
+        COALESCE(sc.signups, 0) AS signups,
+        COALESCE(c.active_users, 0) AS active_users,
+        COALESCE(c.lady_users, 0) AS lady_users,
+        COALESCE(c.spending_users, 0) AS spending_users,
+        COALESCE(c.savings_users, 0) AS savings_users,
+        COALESCE(c.investment_users, 0) AS investment_users,
+        COALESCE(sc.absolute_signups, 0) AS absolute_signups,
         COALESCE(abs_a.absolute_active_users, 0) AS absolute_active_users
     FROM days d
-    LEFT JOIN signups s ON s.dt = d.dt
-    LEFT JOIN active a ON a.dt = d.dt
-    LEFT JOIN lady l ON l.dt = d.dt
-    LEFT JOIN spending sp ON sp.dt = d.dt
-    LEFT JOIN savings sv ON sv.dt = d.dt
-    LEFT JOIN investment iv ON iv.dt = d.dt
-    LEFT JOIN absolute_signups_cumulative abs_s ON abs_s.dt = d.dt
+    LEFT JOIN signups_cumulative sc ON sc.dt = d.dt
+    LEFT JOIN per_feature_counts c ON c.dt = d.dt
     LEFT JOIN absolute_active_cumulative abs_a ON abs_a.dt = d.dt
     ORDER BY d.dt;
     """
 
+
+@query_fallback(pd.DataFrame)
+@cache_by_date_range
+def fetch_overview_trend(start_date, end_date, aggregation='day'):
+    """
+    Trend for signups, active users, Lady AI users, and spending users within the selected period.
+    Also includes absolute (cumulative from inception) metrics.
+    
+    Args:
+        start_date: Start date for the period
+        end_date: End date for the period
+        aggregation: 'day', 'week', or 'month' - determines the granularity of the trend
+    """
+    query = overview_trend_query(aggregation)
+
     params = (
-        start_date, end_date,
-        start_date, end_date,
-        end_date,  # for absolute signups
-        start_date, end_date,
-        start_date, end_date,
-        start_date, end_date,
-        start_date, end_date,
-        start_date, end_date,
+        start_date, end_date,  # days series
+        start_date, end_date,  # period and absolute signups
         end_date,  # for absolute active users (spending)
         end_date,  # for absolute active users (manual transactions)
-        end_date,  # for absolute active users (investment)
-        end_date,  # for absolute active users (savings)
+        end_date,  # for absolute active users (investment and savings)
         end_date,  # for absolute active users (lady ai)
+        start_date,  # period activity
     )
 
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        df = pd.read_sql_query(query, connection, params=params)
+    # One row per period: stream it through COPY rather than row-by-row fetches
+    with get_engine().connect() as connection:
+        df = read_sql_copy(connection, query, params, parse_dates=["activity_date"])
     return df
 
-@st.cache_data(ttl=300)
+@query_fallback(int)
+@cache_by_date_range
 def fetch_churn_count(start_date, end_date):
     """Number of customers who used any feature before end_date but did not use any feature in [start_date, end_date]."""
-    conn = get_database_connection()
-    if conn is None:
-        return 0
-
-    query = """
+    # UNION ALL: grouping by user below already removes duplicates. One pass flags
+    # each user's activity in the period instead of anti-joining two user sets
+    history_query, history_params = feature_history_query(end_date + timedelta(days=1))
+    query = f"""
     WITH all_feature_usage AS (
-        -- Spending
-        SELECT user_id::TEXT AS user_id, DATE(created_at) AS activity_date
-        FROM budgets
-        UNION
-        SELECT user_id::TEXT, DATE(created_at)
-        FROM manual_and_external_transactions
-        UNION
-        -- Investment
-        SELECT ip.user_id::TEXT, DATE(t.updated_at)
-        FROM transactions t
-        JOIN investment_plans ip ON ip.id = t.investment_plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar'
-        UNION
-        -- Savings
-        SELECT p.user_id::TEXT, DATE(t.updated_at)
-        FROM transactions t
-        JOIN plans p ON p.id = t.plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar'
-        UNION
-        -- Lady AI
-        SELECT "user"::TEXT, DATE(created_at)
-        FROM slack_message_dump
-    ), users_ever AS (
-        SELECT DISTINCT user_id
-        FROM all_feature_usage
-        WHERE activity_date <= %s
-    ), users_in_period AS (
-        SELECT DISTINCT user_id
+        {history_query}
+    ), user_periods AS (
+        SELECT user_id, BOOL_OR(activity_date >= %s) AS active_in_period
         FROM all_feature_usage
-        WHERE activity_date BETWEEN %s AND %s
+        GROUP BY user_id
     )
-    SELECT COUNT(*) AS churn_count
-    FROM users_ever e
-    LEFT JOIN users_in_period p ON e.user_id = p.user_id
-    WHERE p.user_id IS NULL;
+    SELECT COUNT(*) FILTER (WHERE NOT active_in_period) AS churn_count
+    FROM user_periods;
     """
 
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        df = pd.read_sql_query(query, connection, params=(end_date, start_date, end_date))
-        return int(df.iloc[0]["churn_count"]) if not df.empty else 0
+    with get_engine().connect() as connection:
+        row = fetch_row_prepared(connection, query, history_params + [start_date])
+        return int(row.get("churn_count", 0))
 
 
 # -------------------------------
 # Customer Feature Analysis Functions
 # -------------------------------
-@st.cache_data(ttl=300)
+@query_fallback(dict)
+@cache_by_date_range
 def fetch_dormant_users_analysis(start_date, end_date, dormant_period_days):
     """Fetch analysis of dormant users - users who used features before but not in the specified period"""
-    conn = get_database_connection()
-    if conn is None:
-        return pd.DataFrame()
-
     # Calculate the historical period (before the current analysis period)
     analysis_start = pd.to_datetime(start_date)
     historical_start = analysis_start - timedelta(days=dormant_period_days)
     
-    query = """
-    WITH users_filtered AS (
-        SELECT id::TEXT AS user_id, DATE(created_at) AS signup_date
-        FROM users
-        WHERE restricted = false
-    ),
-
-    all_feature_usage AS (
-        -- Spending
-        SELECT user_id::TEXT, DATE(created_at) AS activity_date, 'spending' AS feature
-        FROM budgets
-        UNION
-        SELECT user_id::TEXT, DATE(created_at), 'spending'
-        FROM manual_and_external_transactions
-        UNION
-        -- Investment
-        SELECT ip.user_id::TEXT, DATE(t.updated_at), 'investment'
-        FROM transactions t
-        JOIN investment_plans ip ON ip.id = t.investment_plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar'
-        UNION
-        -- Savings
-        SELECT p.user_id::TEXT, DATE(t.updated_at), 'savings'
-        FROM transactions t
-        JOIN plans p ON p.id = t.plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar'
-        UNION
-        -- Lady AI
-        SELECT "user"::TEXT, DATE(created_at), 'lady_ai'
-        FROM slack_message_dump
-    ),
-
-    -- Users who had activity in historical period
-    historical_users AS (
-        SELECT DISTINCT user_id
-        FROM all_feature_usage
-        WHERE activity_date BETWEEN %s AND %s
-    ),
-
-    -- Users who had activity in current analysis period
-    current_users AS (
-        SELECT DISTINCT user_id
-        FROM all_feature_usage
-        WHERE activity_date BETWEEN %s AND %s
-    ),
+    # Both the historical and current windows fall inside historical_start..end_date,
+    # so every UNION ALL branch is bounded to that range
+    activity_query, activity_params = labeled_activity_query(historical_start.date(), end_date)
 
-    -- Overall dormant users (used features historically but not in current period)
-    overall_dormant AS (
-        SELECT h.user_id
-        FROM historical_users h
-        LEFT JOIN current_users c ON h.user_id = c.user_id
-        WHERE c.user_id IS NULL
+    query = f"""
+    WITH all_feature_usage AS (
+        {activity_query}
     ),
 
-    -- Feature-specific dormant users
-    spending_historical AS (
-        SELECT DISTINCT user_id
-        FROM all_feature_usage
-        WHERE feature = 'spending' AND activity_date BETWEEN %s AND %s
-    ),
-    spending_current AS (
-        SELECT DISTINCT user_id
+    -- One row per user and feature, flagging activity in each window
+    user_feature_flags AS (
+        SELECT
+            user_id,
+            feature,
+            BOOL_OR(activity_date BETWEEN %s AND %s) AS in_historical,
+            BOOL_OR(activity_date BETWEEN %s AND %s) AS in_current
         FROM all_feature_usage
-        WHERE feature = 'spending' AND activity_date BETWEEN %s AND %s
-    ),
-    spending_dormant AS (
-        SELECT h.user_id
-        FROM spending_historical h
-        LEFT JOIN spending_current c ON h.user_id = c.user_id
-        WHERE c.user_id IS NULL
+        GROUP BY user_id, feature
     ),
 
-    savings_historical AS (
-        SELECT DISTINCT user_id
-        FROM all_feature_usage
-        WHERE feature = 'savings' AND activity_date BETWEEN %s AND %s
-    ),
-    savings_current AS (
-        SELECT DISTINCT user_id
-        FROM all_feature_usage
-        WHERE feature = 'savings' AND activity_date BETWEEN %s AND %s
-    ),
-    savings_dormant AS (
-        SELECT h.user_id
-        FROM savings_historical h
-        LEFT JOIN savings_current c ON h.user_id = c.user_id
-        WHERE c.user_id IS NULL
+    -- The same flags across all features
+    user_flags AS (
+        SELECT
+            user_id,
+            BOOL_OR(in_historical) AS in_historical,
+            BOOL_OR(in_current) AS in_current
+        FROM user_feature_flags
+        GROUP BY user_id
     ),
 
-    investment_historical AS (
-        SELECT DISTINCT user_id
-        FROM all_feature_usage
-        WHERE feature = 'investment' AND activity_date BETWEEN %s AND %s
-    ),
-    investment_current AS (
-        SELECT DISTINCT user_id
-        FROM all_feature_usage
-        WHERE feature = 'investment' AND activity_date BETWEEN %s AND %s
-    ),
-    investment_dormant AS (
-        SELECT h.user_id
-        FROM investment_historical h
-        LEFT JOIN investment_current c ON h.user_id = c.user_id
-        WHERE c.user_id IS NULL
+    -- Dormant users used a feature historically but not in the current period
+    feature_dormant AS (
+        SELECT
+            COUNT(*) FILTER (WHERE feature = 'spending' AND in_historical AND NOT in_current) AS spending_dormant_users,
+            COUNT(*) FILTER (WHERE feature = 'savings' AND in_historical AND NOT in_current) AS savings_dormant_users,
+            COUNT(*) FILTER (WHERE feature = 'investment' AND in_historical AND NOT in_current) AS investment_dormant_users,
+            COUNT(*) FILTER (WHERE feature = 'lady_ai' AND in_historical AND NOT in_current) AS lady_ai_dormant_users
+        FROM user_feature_flags
     ),
 
-    lady_ai_historical AS (
-        SELECT DISTINCT user_id
-        FROM all_feature_usage
-        WHERE feature = 'lady_ai' AND activity_date BETWEEN %s AND %s
-    ),
-    lady_ai_current AS (
-        SELECT DISTINCT user_id
-        FROM all_feature_usage
-        WHERE feature = 'lady_ai' AND activity_date BETWEEN %s AND %s
-    ),
-    lady_ai_dormant AS (
-        SELECT h.user_id
-        FROM lady_ai_historical h
-        LEFT JOIN lady_ai_current c ON h.user_id = c.user_id
-        WHERE c.user_id IS NULL
+    overall AS (
+        SELECT
+            COUNT(*) FILTER (WHERE in_historical AND NOT in_current) AS overall_dormant_users,
+            COUNT(*) FILTER (WHERE in_historical) AS total_historical_users,
+            COUNT(*) FILTER (WHERE in_current) AS total_current_users
+        FROM user_flags
     )
 
     SELECT
-        (SELECT COUNT(*) FROM overall_dormant) AS overall_dormant_users,
-        (SELECT COUNT(*) FROM spending_dormant) AS spending_dormant_users,
-        (SELECT COUNT(*) FROM savings_dormant) AS savings_dormant_users,
-        (SELECT COUNT(*) FROM investment_dormant) AS investment_dormant_users,
-        (SELECT COUNT(*) FROM lady_ai_dormant) AS lady_ai_dormant_users,
-        (SELECT COUNT(*) FROM historical_users) AS total_historical_users,
-        (SELECT COUNT(*) FROM current_users) AS total_current_users;
+        o.overall_dormant_users,
+        fd.spending_dormant_users,
+        fd.savings_dormant_users,
+        fd.investment_dormant_users,
+        fd.lady_ai_dormant_users,
+        o.total_historical_users,
+        o.total_current_users
+    FROM overall o
+    CROSS JOIN feature_dormant fd;
     """
 
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        params = [
+    with get_engine().connect() as connection:
+        params = activity_params + [
             historical_start.date(), analysis_start.date(),  # Historical period
             start_date, end_date,  # Current analysis period
-            historical_start.date(), analysis_start.date(),  # Spending historical
-            start_date, end_date,  # Spending current
-            historical_start.date(), analysis_start.date(),  # Savings historical
-            start_date, end_date,  # Savings current
-            historical_start.date(), analysis_start.date(),  # Investment historical
-            start_date, end_date,  # Investment current
-            historical_start.date(), analysis_start.date(),  # Lady AI historical
-            start_date, end_date,  # Lady AI current
         ]
-        df = pd.read_sql_query(query, connection, params=tuple(params))
-        return df
+        return fetch_row_prepared(connection, query, params)
 
 
-@st.cache_data(ttl=300)
+@query_fallback(pd.DataFrame)
+@cache_by_date_range
 def fetch_dormant_users_trend(start_date, end_date, dormant_period_days):
     """Fetch trend data for dormant users over time"""
-    conn = get_database_connection()
-    if conn is None:
-        return pd.DataFrame()
-
     # Calculate the historical period
     analysis_start = pd.to_datetime(start_date)
     historical_start = analysis_start - timedelta(days=dormant_period_days)
     
-    query = """
-    WITH all_feature_usage AS (
-        -- Spending
-        SELECT user_id::TEXT, DATE(created_at) AS activity_date, 'spending' AS feature
-        FROM budgets
-        UNION
-        SELECT user_id::TEXT, DATE(created_at), 'spending'
-        FROM manual_and_external_transactions
-        UNION
-        -- Investment
-        SELECT ip.user_id::TEXT, DATE(t.updated_at), 'investment'
-        FROM transactions t
-        JOIN investment_plans ip ON ip.id = t.investment_plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar'
-        UNION
-        -- Savings
-        SELECT p.user_id::TEXT, DATE(t.updated_at), 'savings'
-        FROM transactions t
-        JOIN plans p ON p.id = t.plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar'
-        UNION
-        -- Lady AI
-        SELECT "user"::TEXT, DATE(created_at), 'lady_ai'
-        FROM slack_message_dump
+    # Both the historical and current windows fall inside historical_start..end_date,
+    # so every UNION ALL branch is bounded to that range
+    activity_query, activity_params = labeled_activity_query(historical_start.date(), end_date)
+
+    query = f"""
+    -- Only (user, day) pairs matter here, so the activity is deduplicated once
+    -- and materialized for the three reads below
+    WITH daily_users AS MATERIALIZED (
+        SELECT DISTINCT user_id, activity_date
+        FROM ({activity_query}) activity
     ),
 
     -- Get all unique dates in the analysis period
     analysis_dates AS (
         SELECT DISTINCT activity_date
-        FROM all_feature_usage
+        FROM daily_users
         WHERE activity_date BETWEEN %s AND %s
         ORDER BY activity_date
     ),
 
-    -- For each date, calculate dormant users
+    -- Users who had activity in the historical period
+    historical_users AS (
+        SELECT DISTINCT user_id
+        FROM daily_users
+        WHERE activity_date BETWEEN %s AND %s
+    ),
+
+    -- Historical users active on each day of the current period
+    historical_active AS (
+        SELECT du.activity_date, COUNT(*) AS active_users
+        FROM daily_users du
+        JOIN historical_users h ON h.user_id = du.user_id
+        WHERE du.activity_date BETWEEN %s AND %s
+        GROUP BY du.activity_date
+    ),
+
+    historical_count AS (
+        SELECT COUNT(*) AS historical_users FROM historical_users
+    ),
+
+    -- Dormant on a date = historical users minus those active that day;
+    -- with no historical users there is nobody to be dormant, so no rows
     daily_dormant AS (
-        SELECT 
+        SELECT
             ad.activity_date,
-            COUNT(DISTINCT h.user_id) AS dormant_count
+            hc.historical_users - COALESCE(ha.active_users, 0) AS dormant_count
         FROM analysis_dates ad
-        CROSS JOIN (
-            SELECT DISTINCT user_id
-            FROM all_feature_usage
-            WHERE activity_date BETWEEN %s AND %s
-        ) h
-        LEFT JOIN (
-            SELECT DISTINCT user_id, activity_date
-            FROM all_feature_usage
-            WHERE activity_date BETWEEN %s AND %s
-        ) c ON h.user_id = c.user_id AND c.activity_date = ad.activity_date
-        WHERE c.user_id IS NULL
-        GROUP BY ad.activity_date
+        CROSS JOIN historical_count hc
+        LEFT JOIN historical_active ha ON ha.activity_date = ad.activity_date
+        WHERE hc.historical_users > 0
         ORDER BY ad.activity_date
     )
 
     SELECT * FROM daily_dormant;
     """
 
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        params = [
+    with get_engine().connect() as connection:
+        params = activity_params + [
             start_date, end_date,  # Analysis period for dates
             historical_start.date(), analysis_start.date(),  # Historical period for users
             start_date, end_date,  # Current period for comparison
         ]
-        df = pd.read_sql_query(query, connection, params=tuple(params))
+        df = read_sql_copy(connection, query, tuple(params), parse_dates=["activity_date"])
         return df
 
 
-def analyze_feature_usage_patterns(comprehensive_df):
+# Display names and metric keys for the usage pattern analysis, in tie-break order
+PATTERN_FEATURE_NAMES = np.array(["Spending", "Savings", "Investment", "Lady AI"])
+PATTERN_FEATURE_KEYS = ("spending_users", "savings_users", "investment_users", "lady_ai_users")
+
+
+def analyze_feature_usage_patterns(metrics):
     """Analyze feature usage patterns and provide insights"""
     insights = []
     
-    if comprehensive_df.empty:
+    if not metrics:
         return insights
     
-    # Get feature usage counts
-    spending_users = comprehensive_df['spending_users'][0]
-    savings_users = comprehensive_df['savings_users'][0] 
-    investment_users = comprehensive_df['investment_users'][0]
-    lady_ai_users = comprehensive_df['lady_ai_users'][0]
-    
-    # Find most and least used features
-    feature_usage = {
-        'Spending': spending_users,
-        'Savings': savings_users,
-        'Investment': investment_users,
-        'Lady AI': lady_ai_users
-    }
-    
-    most_used = max(feature_usage, key=feature_usage.get)
-    least_used = min(feature_usage, key=feature_usage.get)
+    # Find most and least used features; argmax/argmin keep the first feature on ties
+    counts = np.array([metrics[key] for key in PATTERN_FEATURE_KEYS], dtype=np.int64)
+    most_idx, least_idx = counts.argmax(), counts.argmin()
     
     # Calculate feature usage percentages
-    total_active = comprehensive_df['total_active_users'][0]
+    total_active = metrics['total_active_users']
     if total_active > 0:
-        most_used_pct = (feature_usage[most_used] / total_active) * 100
-        least_used_pct = (feature_usage[least_used] / total_active) * 100
+        pct = counts * (100.0 / total_active)
         
         insights.append({
-            'most_used_feature': most_used,
-            'most_used_count': feature_usage[most_used],
-            'most_used_pct': most_used_pct,
-            'least_used_feature': least_used,
-            'least_used_count': feature_usage[least_used],
-            'least_used_pct': least_used_pct
+            'most_used_feature': str(PATTERN_FEATURE_NAMES[most_idx]),
+            'most_used_count': int(counts[most_idx]),
+            'most_used_pct': float(pct[most_idx]),
+            'least_used_feature': str(PATTERN_FEATURE_NAMES[least_idx]),
+            'least_used_count': int(counts[least_idx]),
+            'least_used_pct': float(pct[least_idx])
         })
     
     return insights
 
 
-def generate_insights(metrics_df, retention_df, feature=None):
-    """Generate actionable insights based on the data"""
+@st.cache_data(ttl=600, show_spinner=False)
+def generate_insights(metrics, retention, feature=None):
+    """Generate actionable insights from a metrics row and a retention row, each a plain dict"""
     insights = []
 
-    if not metrics_df.empty:
+    if not metrics and not retention:
+        return insights
+
+    if metrics:
         # Engagement insights
-        total_signups = (
-            metrics_df["total_signups"].iloc[0]
-            if "total_signups" in metrics_df.columns
-            else 0
-        )
-        total_active = (
-            metrics_df["total_active_users"].iloc[0]
-            if "total_active_users" in metrics_df.columns
-            else 0
-        )
+        total_signups = metrics.get("total_signups", 0)
+        total_active = metrics.get("total_active_users", 0)
 
         if total_signups > 0:
             activation_rate = (total_active / total_signups) * 100
@@ -1424,17 +1600,9 @@ def generate_insights(metrics_df, retention_df, feature=None):
                     }
                 )
 
-    if not retention_df.empty and "day1_retention" in retention_df.columns:
-        day1_retention = (
-            retention_df["day1_retention"].iloc[0] * 100
-            if retention_df["day1_retention"].iloc[0]
-            else 0
-        )
-        week1_retention = (
-            retention_df["week1_retention"].iloc[0] * 100
-            if retention_df["week1_retention"].iloc[0]
-            else 0
-        )
+    if "day1_pct" in retention:
+        day1_retention = retention["day1_pct"]
+        week1_retention = retention["week1_pct"]
 
         if day1_retention < 20:
             insights.append(
@@ -1502,407 +1670,353 @@ range_choice = st.sidebar.selectbox("📅 Date Range", options.keys(), index=1)
 if range_choice == "Custom":
     start_date = st.sidebar.date_input("Start", today - timedelta(days=30))
     end_date = st.sidebar.date_input("End", today)
+    if start_date > end_date:
+        st.sidebar.error("Start date must be on or before the end date.")
+        st.stop()
 else:
     start_date, end_date = options[range_choice]
 
+# Cached results (including the on-disk history) are otherwise only replaced
+# when they expire, so ops can force a refetch from here
+if st.sidebar.button("🔄 Refresh data"):
+    st.cache_data.clear()
+    fetch_period_activity.clear()
+    load_ffp_data.clear()
+
 # -------------------------------
 # Fetch Absolute Metrics
 # -------------------------------
-@st.cache_data(ttl=300)
+@query_fallback(dict)
+@cache_by_date_range
 def fetch_absolute_metrics(end_date):
     """
     Fetch absolute metrics from inception to the end date.
     Returns total signups and active users since inception.
     """
-    conn = get_database_connection()
-    if conn is None:
-        return {}
-
+    # Only user identity matters here, so each source collapses to its own
+    # distinct users before the union instead of carrying every activity row
     absolute_query = """
-    WITH feature_usage AS (
-        SELECT user_id::TEXT, DATE(created_at) AS activity_date
-        FROM budgets WHERE DATE(created_at) <= %s
-        UNION
-        SELECT user_id::TEXT, DATE(created_at)
-        FROM manual_and_external_transactions WHERE DATE(created_at) <= %s
+    WITH active_users AS (
+        SELECT DISTINCT user_id::TEXT AS user_id
+        FROM budgets WHERE created_at < (%s::date + INTERVAL '1 day')
         UNION
-        SELECT ip.user_id::TEXT, DATE(t.updated_at)
-        FROM transactions t
-        JOIN investment_plans ip ON ip.id = t.investment_plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) <= %s
+        SELECT DISTINCT user_id::TEXT
+        FROM manual_and_external_transactions WHERE created_at < (%s::date + INTERVAL '1 day')
         UNION
-        SELECT p.user_id::TEXT, DATE(t.updated_at)
+        SELECT DISTINCT plan.user_id
         FROM transactions t
-        JOIN plans p ON p.id = t.plan_id
-        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND DATE(t.updated_at) <= %s
+        LEFT JOIN investment_plans ip ON ip.id = t.investment_plan_id
+        LEFT JOIN plans p ON p.id = t.plan_id
+        CROSS JOIN LATERAL (VALUES (ip.user_id::TEXT), (p.user_id::TEXT)) AS plan(user_id)
+        WHERE t.status = 'success' AND t.provider_number != 'Flex Dollar' AND t.updated_at < (%s::date + INTERVAL '1 day')
+          AND plan.user_id IS NOT NULL
         UNION
-        SELECT "user"::TEXT, DATE(created_at)
-        FROM slack_message_dump WHERE DATE(created_at) <= %s
+        SELECT DISTINCT "user"::TEXT
+        FROM slack_message_dump WHERE created_at < (%s::date + INTERVAL '1 day')
     )
     SELECT 
-        (SELECT COUNT(*) FROM users WHERE DATE(created_at) <= %s AND restricted = false) AS absolute_total_signups,
-        (SELECT COUNT(DISTINCT user_id) FROM feature_usage) AS absolute_total_active_users;
+        (SELECT COUNT(*) FROM users WHERE created_at < (%s::date + INTERVAL '1 day') AND restricted = false) AS absolute_total_signups,
+        (SELECT COUNT(*) FROM active_users) AS absolute_total_active_users;
     """
 
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        abs_df = pd.read_sql_query(absolute_query, connection, params=(end_date, end_date, end_date, end_date, end_date, end_date))
-        if not abs_df.empty:
-            return abs_df.iloc[0].to_dict()
-    return {}
-
-# Fetch comprehensive metrics
-comprehensive_df = fetch_comprehensive_metrics(start_date, end_date)
-
-# Fetch absolute metrics HERE (before using them in tabs)
-absolute_metrics = fetch_absolute_metrics(end_date)
+    with get_engine().connect() as connection:
+        return fetch_row_prepared(connection, absolute_query, (end_date,) * absolute_query.count("%s"))
 
 # -------------------------------
 # Main Dashboard - Overview Tab System
 # -------------------------------
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(
-    [
-        "📊 Overview",
-        "💰 Spending Analytics",
-        "🤖 Lady AI Analytics",
-        "🏦 Savings Analytics",
-        "📈 Investment Analytics",
-        "📋 FFP Engagement",
-        "🔍 Customer Feature Analysis",
-    ]
+# Section label -> (feature, display name) for the feature deep-dive sections
+FEATURE_SECTIONS = {
+    "💰 Spending Analytics": ("spending", "Spending"),
+    "🤖 Lady AI Analytics": ("lady_ai", "Lady AI"),
+    "🏦 Savings Analytics": ("savings", "Savings"),
+    "📈 Investment Analytics": ("investment", "Investment"),
+}
+
+# st.tabs runs every tab's body on each rerun, so sections are picked with a
+# tab-style radio instead and only the selected one queries and renders
+active_section = st.radio(
+    "Dashboard section",
+    ["📊 Overview", *FEATURE_SECTIONS, "📋 FFP Engagement", "🔍 Customer Feature Analysis"],
+    horizontal=True,
+    key="active_section",
+    label_visibility="collapsed",
 )
 
-with tab1:
-    st.markdown('<div class="feature-section">', unsafe_allow_html=True)
+
+# Each tab body is a fragment, so its own widgets (aggregation, dormant
+# period, ...) rerun only that tab instead of the whole dashboard
+@st.fragment
+def render_overview_tab(start_date, end_date):
+    # The overview's queries are independent, so they run concurrently; cache hits return immediately.
+    # overall_retention is shared by the retention cards and the retention insights below
+    (
+        comprehensive,
+        absolute_metrics,
+        overall_retention,
+        churn_kpi,
+        feature_combinations_df,
+    ) = run_parallel(
+        partial(fetch_comprehensive_metrics, start_date, end_date),
+        partial(fetch_absolute_metrics, end_date),
+        partial(fetch_retention_metrics, start_date, end_date),
+        partial(fetch_churn_count, start_date, end_date),
+        partial(fetch_feature_combinations, start_date, end_date),
+    )
+
     st.subheader("🎯 Key Performance Indicators")
 
     # Absolute Metrics Row
     if absolute_metrics:
-        col_abs1, col_abs2 = st.columns(2)
-        with col_abs1:
-            st.markdown(
-                create_metric_card(
+        render_metric_row(
+            [
+                (
                     "Absolute Total Signups",
                     f"{absolute_metrics['absolute_total_signups']:,}",
                     f"Total signups from inception to {end_date}",
                     "navy",
                     "🚀",
                 ),
-                unsafe_allow_html=True,
-            )
-        with col_abs2:
-            st.markdown(
-                create_metric_card(
+                (
                     "Absolute Active Users",
                     f"{absolute_metrics['absolute_total_active_users']:,}",
                     f"Total active users from inception to {end_date}",
                     "navy",
                     "⚡",
                 ),
-                unsafe_allow_html=True,
-            )
+            ]
+        )
 
         st.subheader("📈 Comprehensive Metrics Overview")
         # Period-Specific Metrics
-        if not comprehensive_df.empty:
+        if comprehensive:
             # Row 1: Core Metrics
-            col1, col2, col3, col4, col5 = st.columns(5)
-
-            with col1:
-                st.markdown(
-                    create_metric_card(
+            render_metric_row(
+                [
+                    (
                         "Total Signups",
-                        f"{comprehensive_df['total_signups'][0]:,}",
+                        f"{comprehensive['total_signups']:,}",
                         f"New signups from {start_date} to {end_date}",
                         "azure",
                         "👥",
                     ),
-                    unsafe_allow_html=True,
-                )
-
-            with col2:
-                st.markdown(
-                    create_metric_card(
+                    (
                         "Total Active Users",
-                        f"{comprehensive_df['total_active_users'][0]:,}",
+                        f"{comprehensive['total_active_users']:,}",
                         f"Users active from {start_date} to {end_date}",
                         "azure",
                         "🎯",
                     ),
-                    unsafe_allow_html=True,
-                )
-
-            with col3:
-                st.markdown(
-                    create_metric_card(
+                    (
                         "First Time Users",
-                        f"{comprehensive_df['first_time_users'][0]:,}",
+                        f"{comprehensive['first_time_users']:,}",
                         "Users who used features for the first time in this period",
                         "azure",
                         "🌟",
                     ),
-                    unsafe_allow_html=True,
-                )
-            with col4:
-                st.markdown(
-                    create_metric_card(
+                    (
                         "One Time Usage Users",
-                        f"{comprehensive_df['one_time_usage_users'][0]:,}",
+                        f"{comprehensive['one_time_usage_users']:,}",
                         "Users active on exactly one day",
                         "azure",
                         "📅",
                     ),
-                    unsafe_allow_html=True,
-                )
-
-            with col5:
-                churn_kpi = fetch_churn_count(start_date, end_date)
-                st.markdown(
-                    create_metric_card(
+                    (
                         "User Churn",
                         f"{churn_kpi:,}",
                         f"No activity between {start_date} and {end_date}",
                         "red",
                         "📉",
                     ),
-                    unsafe_allow_html=True,
-                )
+                ]
+            )
 
         # Additional metrics row
-        if not comprehensive_df.empty:
-            col_add1, col_add2, col_add3 = st.columns(3)
-            
-            with col_add1:
-                st.markdown(
-                    create_metric_card(
-                        "Recurring Users",
-                        f"{comprehensive_df['recurring_users'][0]:,}",
-                        "Users with multiple active days",
-                        "azure",
-                        "🔄",
-                    ),
-                    unsafe_allow_html=True,
-                )
-            
-            with col_add2:
-                # Calculate Signup Conversion Rate with insights
-                total_signups = comprehensive_df['total_signups'][0]
-                first_time_users = comprehensive_df['first_time_users'][0]
-                conversion_rate = (first_time_users / total_signups * 100) if total_signups > 0 else 0
-                
-                # Determine alert level and insight
-                conversion_alert = "high" if conversion_rate < 20 else "medium" if conversion_rate < 40 else "low"
-                conversion_insight = "Critical: Improve onboarding flow" if conversion_rate < 20 else "Good: Focus on activation campaigns" if conversion_rate < 40 else "Excellent: Maintain current strategy"
-                
-                # Create the metric card HTML
-                metric_html = create_metric_card(
-                    "Signup Conversion Rate",
-                    f"{conversion_rate:.1f}%",
-                    f"{first_time_users:,} of {total_signups:,} signups activated",
-                    "green" if conversion_rate > 40 else "orange" if conversion_rate > 20 else "red",
-                    "📈",
-                    alert_level=conversion_alert,
-                    additional_insight=conversion_insight
-                )
-                # Use components.html for better HTML rendering
-                components.html(metric_html, height=200)
-            
-            with col_add3:
-                # Calculate feature adoption rate with insights
-                total_active = comprehensive_df['total_active_users'][0]
-                first_time_users = comprehensive_df['first_time_users'][0]
-                feature_adoption = min((first_time_users / total_active * 100), 100.0) if total_active > 0 else 0
-                
-                # Determine alert level and insight
-                adoption_alert = "high" if feature_adoption > 80 else "medium" if feature_adoption > 50 else "low"
-                adoption_insight = "High new user acquisition" if feature_adoption > 80 else "Balanced user growth" if feature_adoption > 50 else "Focus on user retention"
-                
-                # Create the metric card HTML
-                adoption_html = create_metric_card(
-                    "Feature Adoption Rate",
-                    f"{feature_adoption:.1f}%",
-                    f"{first_time_users:,} new feature users",
-                    "green" if feature_adoption > 70 else "orange" if feature_adoption > 40 else "red",
-                    "🎯",
-                    alert_level=adoption_alert,
-                    additional_insight=adoption_insight
-                )
-                # Use components.html for better HTML rendering
-                components.html(adoption_html, height=200)
+        if comprehensive:
+            recurring_html = create_metric_card(
+                "Recurring Users",
+                f"{comprehensive['recurring_users']:,}",
+                "Users with multiple active days",
+                "azure",
+                "🔄",
+            )
+
+            # Calculate Signup Conversion Rate with insights
+            total_signups = comprehensive['total_signups']
+            first_time_users = comprehensive['first_time_users']
+            conversion_rate = (first_time_users / total_signups * 100) if total_signups > 0 else 0
+
+            # Determine alert level and insight
+            conversion_alert, conversion_insight = CONVERSION_TIERS[(conversion_rate >= 20) + (conversion_rate >= 40)]
+
+            # Create the metric card HTML
+            metric_html = create_metric_card(
+                "Signup Conversion Rate",
+                f"{conversion_rate:.1f}%",
+                f"{first_time_users:,} of {total_signups:,} signups activated",
+                TIER_COLORS[(conversion_rate > 20) + (conversion_rate > 40)],
+                "📈",
+                alert_level=conversion_alert,
+                additional_insight=conversion_insight
+            )
+
+            # Calculate feature adoption rate with insights
+            total_active = comprehensive['total_active_users']
+            first_time_users = comprehensive['first_time_users']
+            feature_adoption = min((first_time_users / total_active * 100), 100.0) if total_active > 0 else 0
+
+            # Determine alert level and insight
+            adoption_alert, adoption_insight = ADOPTION_TIERS[(feature_adoption > 50) + (feature_adoption > 80)]
 
-        # Row 4: Enhanced Feature-Specific Metrics with Insights
-        st.subheader("🎪 Feature Engagement with Insights")
-        col3, col4, col5, col6 = st.columns(4)
+            # Create the metric card HTML
+            adoption_html = create_metric_card(
+                "Feature Adoption Rate",
+                f"{feature_adoption:.1f}%",
+                f"{first_time_users:,} new feature users",
+                TIER_COLORS[(feature_adoption > 40) + (feature_adoption > 70)],
+                "🎯",
+                alert_level=adoption_alert,
+                additional_insight=adoption_insight
+            )
+            render_metric_row([recurring_html, metric_html, adoption_html])
 
-        # Calculate feature usage percentages for insights
-        total_active = comprehensive_df['total_active_users'][0]
-        spending_pct = (comprehensive_df['spending_users'][0] / total_active * 100) if total_active > 0 else 0
-        lady_ai_pct = (comprehensive_df['lady_ai_users'][0] / total_active * 100) if total_active > 0 else 0
-        savings_pct = (comprehensive_df['savings_users'][0] / total_active * 100) if total_active > 0 else 0
-        investment_pct = (comprehensive_df['investment_users'][0] / total_active * 100) if total_active > 0 else 0
+        # Rows 4 and 2 read the comprehensive metrics, which are empty if their query failed
+        if comprehensive:
+            # Row 4: Enhanced Feature-Specific Metrics with Insights
+            st.subheader("🎪 Feature Engagement with Insights")
+
+            # Calculate feature usage percentages for insights
+            total_active = comprehensive['total_active_users']
+            counts = np.fromiter(
+                (comprehensive[key] for key in FEATURE_KEYS), dtype=np.int64, count=len(FEATURE_KEYS)
+            )
+            spending_users, lady_ai_users, savings_users, investment_users = counts.tolist()
+            pct = counts.astype(np.float64) * (100.0 / total_active) if total_active > 0 else np.zeros(len(counts))
+            spending_pct, lady_ai_pct, savings_pct, investment_pct = pct.tolist()
 
-        with col3:
             # Determine alert level and insight for spending
-            spending_alert = "low" if spending_pct > 40 else "medium" if spending_pct < 20 else "info"
-            spending_insight = "Strong spending engagement" if spending_pct > 40 else "Consider spending feature promotion" if spending_pct < 20 else "Normal spending usage"
-            
+            spending_alert, spending_insight = feature_usage_tier("spending", spending_pct)
+
             spending_html = create_metric_card(
                 "Spending Users",
-                f"{comprehensive_df['spending_users'][0]:,}",
+                f"{spending_users:,}",
                 f"{spending_pct:.1f}% of active users",
                 "blue",  # Blue for spending
                 "💰",
                 alert_level=spending_alert,
                 additional_insight=spending_insight
             )
-            components.html(spending_html, height=200)
 
-        with col4:
             # Determine alert level and insight for Lady AI
-            lady_ai_alert = "low" if lady_ai_pct > 30 else "medium" if lady_ai_pct < 10 else "info"
-            lady_ai_insight = "High AI engagement" if lady_ai_pct > 30 else "Boost Lady AI adoption" if lady_ai_pct < 10 else "Steady AI usage"
-            
+            lady_ai_alert, lady_ai_insight = feature_usage_tier("lady_ai", lady_ai_pct)
+
             lady_ai_html = create_metric_card(
                 "Lady AI Users",
-                f"{comprehensive_df['lady_ai_users'][0]:,}",
+                f"{lady_ai_users:,}",
                 f"{lady_ai_pct:.1f}% of active users",
                 "orange",  # Orange for Lady AI
                 "🤖",
                 alert_level=lady_ai_alert,
                 additional_insight=lady_ai_insight
             )
-            components.html(lady_ai_html, height=200)
 
-        with col5:
             # Determine alert level and insight for savings
-            savings_alert = "low" if savings_pct > 25 else "medium" if savings_pct < 15 else "info"
-            savings_insight = "Strong savings culture" if savings_pct > 25 else "Promote savings features" if savings_pct < 15 else "Healthy savings usage"
-            
+            savings_alert, savings_insight = feature_usage_tier("savings", savings_pct)
+
             savings_html = create_metric_card(
                 "Savings Users",
-                f"{comprehensive_df['savings_users'][0]:,}",
+                f"{savings_users:,}",
                 f"{savings_pct:.1f}% of active users",
                 "green",
                 "🏦",
                 alert_level=savings_alert,
                 additional_insight=savings_insight
             )
-            components.html(savings_html, height=200)
 
-        with col6:
             # Determine alert level and insight for investment
-            investment_alert = "low" if investment_pct > 20 else "medium" if investment_pct < 8 else "info"
-            investment_insight = "High investment engagement" if investment_pct > 20 else "Focus on investment adoption" if investment_pct < 8 else "Growing investment usage"
-            
+            investment_alert, investment_insight = feature_usage_tier("investment", investment_pct)
+
             investment_html = create_metric_card(
                 "Investment Users",
-                f"{comprehensive_df['investment_users'][0]:,}",
+                f"{investment_users:,}",
                 f"{investment_pct:.1f}% of active users",
                 "purple",
                 "📈",
                 alert_level=investment_alert,
                 additional_insight=investment_insight
             )
-            components.html(investment_html, height=200)
+            render_metric_row([spending_html, lady_ai_html, savings_html, investment_html])
 
-        # Row 2: Overall Engagement Metrics
-        st.subheader("📊 Overall Engagement Metrics")
-        col_eng1, col_eng2, col_eng3 = st.columns(3)
-        
-        with col_eng1:
-            st.markdown(
-                create_metric_card(
-                    "Average DAU",
-                    f"{comprehensive_df['avg_dau'][0]:,.0f}",
-                    "Average daily active users across all features",
-                    "azure",
-                    "📅",
-                ),
-                unsafe_allow_html=True,
-            )
-        
-        with col_eng2:
-            st.markdown(
-                create_metric_card(
-                    "Average WAU",
-                    f"{comprehensive_df['avg_wau'][0]:,.0f}",
-                    "Average weekly active users across all features",
-                    "azure",
-                    "📆",
-                ),
-                unsafe_allow_html=True,
-            )
-        
-        with col_eng3:
-            st.markdown(
-                create_metric_card(
-                    "Average MAU",
-                    f"{comprehensive_df['avg_mau'][0]:,.0f}",
-                    "Average monthly active users across all features",
-                    "azure",
-                    "🗓️",
-                ),
-                unsafe_allow_html=True,
+            # Row 2: Overall Engagement Metrics
+            st.subheader("📊 Overall Engagement Metrics")
+            render_metric_row(
+                [
+                    (
+                        "Average DAU",
+                        f"{comprehensive['avg_dau']:,.0f}",
+                        "Average daily active users across all features",
+                        "azure",
+                        "📅",
+                    ),
+                    (
+                        "Average WAU",
+                        f"{comprehensive['avg_wau']:,.0f}",
+                        "Average weekly active users across all features",
+                        "azure",
+                        "📆",
+                    ),
+                    (
+                        "Average MAU",
+                        f"{comprehensive['avg_mau']:,.0f}",
+                        "Average monthly active users across all features",
+                        "azure",
+                        "🗓️",
+                    ),
+                ]
             )
 
         # Daily Trend: configurable and polished
         st.subheader("📈 Trend Analysis")
 
         # Determine default aggregation based on date range
-        from datetime import datetime
-        from dateutil.relativedelta import relativedelta
-
-        start_dt = datetime.strptime(str(start_date), '%Y-%m-%d')
-        end_dt = datetime.strptime(str(end_date), '%Y-%m-%d')
-        months_diff = (end_dt.year - start_dt.year) * 12 + (end_dt.month - start_dt.month)
+        months_diff = (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month)
 
         # Auto-select month aggregation if 2+ months, otherwise day
         default_aggregation = 'month' if months_diff >= 2 else 'day'
 
         # Let user override the aggregation
-        aggregation_options = {
-            'Day-to-Day': 'day',
-            'Week-to-Week': 'week',
-            'Month-to-Month': 'month'
-        }
-
         col_agg, col_metrics = st.columns([1, 2])
 
         with col_agg:
             selected_agg_display = st.selectbox(
                 "Trend Granularity",
-                options=list(aggregation_options.keys()),
-                index=list(aggregation_options.values()).index(default_aggregation),
+                options=list(TREND_AGGREGATION_OPTIONS),
+                index=list(TREND_AGGREGATION_OPTIONS.values()).index(default_aggregation),
                 help=f"{'Auto-selected Month-to-Month (2+ months in period). ' if default_aggregation == 'month' else ''}Choose how to aggregate the trend data"
             )
-            aggregation = aggregation_options[selected_agg_display]
+            aggregation = TREND_AGGREGATION_OPTIONS[selected_agg_display]
 
         with col_metrics:
-            metric_display_to_col = {
-                "Signups": "signups",
-                "Active Users": "active_users",
-                "Absolute Signups": "absolute_signups",
-                "Absolute Active Users": "absolute_active_users",
-                "Lady Users": "lady_users",
-                "Spending Users": "spending_users",
-                "Savings Users": "savings_users",
-                "Investment Users": "investment_users",
-            }
             default_metrics = ["Signups", "Active Users"]
             selected = st.multiselect(
                 "Select trend lines",
-                options=list(metric_display_to_col.keys()),
+                options=list(TREND_METRIC_COLUMNS),
                 default=default_metrics,
                 help="Period metrics show activity within selected dates. Absolute metrics show cumulative totals from inception.",
             )
 
-        # Fetch trend data with selected aggregation
-        trend_df = fetch_overview_trend(start_date, end_date, aggregation)
+        # Nothing to plot without a selection, so the trend query is skipped entirely
+        if not selected:
+            st.info("Please select at least one metric to display the trend.")
+            trend_df = pd.DataFrame()
+        else:
+            trend_df = fetch_overview_trend(start_date, end_date, aggregation)
 
-        if not trend_df.empty and selected:
-            selected_cols = [metric_display_to_col[m] for m in selected]
-            base_cols = ["activity_date"] + selected_cols
-            df_plot = trend_df[base_cols].copy()
+        if not trend_df.empty:
+            # Columns are renamed to their display names up front, so the traces
+            # read straight from the wide frame without melting or mapping names
+            rename_map = {TREND_METRIC_COLUMNS[m]: m for m in selected}
+            df_plot = trend_df[["activity_date", *rename_map]].rename(columns=rename_map)
 
             # Optional smoothing (only show for day and week aggregations)
             smooth = False
@@ -1912,45 +2026,31 @@ with tab1:
                     value=False
                 )
 
-            plot_df = df_plot.melt(
-                id_vars=["activity_date"],
-                var_name="metric",
-                value_name="count",
-            )
-            metric_name_map = {v: k for k, v in metric_display_to_col.items()}
-            plot_df["metric"] = plot_df["metric"].map(metric_name_map)
-            plot_df = plot_df.sort_values(["metric", "activity_date"])
-            
+            # The trend has one row per period in date order, so every metric column
+            # is smoothed in one rolling pass over the wide frame
             if smooth:
                 window_size = 7 if aggregation == 'day' else 4
-                plot_df["count"] = (
-                    plot_df.groupby("metric")["count"].transform(
-                        lambda s: s.rolling(window_size, min_periods=1).mean()
-                    )
-                )
-
-            color_map = {
-                "Signups": LADDER_COLORS["navy"],
-                "Active Users": LADDER_COLORS["azure"],
-                "Absolute Signups": LADDER_COLORS["purple"],
-                "Absolute Active Users": LADDER_COLORS["orange"],
-                "Lady Users": LADDER_COLORS["orange"],
-                "Spending Users": LADDER_COLORS["blue"],
-                "Savings Users": LADDER_COLORS["green"],
-                "Investment Users": LADDER_COLORS["purple"],
-            }
-
-            fig_overview_trend = px.line(
-                plot_df,
-                x="activity_date",
-                y="count",
-                color="metric",
-                color_discrete_map=color_map,
-                markers=True,
-                labels={"activity_date": "Date", "count": "Users", "metric": ""},
-            )
-            fig_overview_trend.update_traces(line=dict(width=3), marker=dict(size=6, symbol="circle"))
+                df_plot[selected] = df_plot[selected].rolling(window_size, min_periods=1).mean()
+
+            # One trace per metric added directly, skipping Plotly Express' per-call setup;
+            # long day-level ranges are thinned with LTTB per metric
+            fig_overview_trend = go.Figure()
+            dates = df_plot["activity_date"].to_numpy()
+            for metric in sorted(selected):
+                metric_x, metric_y = downsample_lttb(dates, df_plot[metric].to_numpy())
+                fig_overview_trend.add_trace(
+                    go.Scatter(
+                        x=metric_x,
+                        y=metric_y,
+                        mode="lines+markers",
+                        name=metric,
+                        line=dict(width=3, color=TREND_METRIC_COLORS[metric]),
+                        marker=dict(size=6, symbol="circle"),
+                    )
+                )
             fig_overview_trend.update_layout(
+                xaxis_title="Date",
+                yaxis_title="Users",
                 hovermode="x unified",
                 margin=dict(l=0, r=0, t=10, b=0),
                 plot_bgcolor="rgba(0,0,0,0)",
@@ -1960,78 +2060,62 @@ with tab1:
                 legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
             )
             st.plotly_chart(fig_overview_trend, use_container_width=True)
-        else:
-            if not selected:
-                st.info("Please select at least one metric to display the trend.")
 
 
         # Row 3: Overall Retention Metrics
         st.subheader("🔄 Overall Retention Metrics")
-        col_ret1, col_ret2, col_ret3 = st.columns(3)
         
-        # Fetch overall retention data
-        overall_retention = fetch_retention_metrics(start_date, end_date)
-        
-        if not overall_retention.empty:
-            day1_ret = overall_retention['day1_retention'][0] * 100 if overall_retention['day1_retention'][0] else 0
-            week1_ret = overall_retention['week1_retention'][0] * 100 if overall_retention['week1_retention'][0] else 0
-            month1_ret = overall_retention['month1_retention'][0] * 100 if overall_retention['month1_retention'][0] else 0
+        if overall_retention:
+            day1_ret, week1_ret, month1_ret = (
+                overall_retention["day1_pct"],
+                overall_retention["week1_pct"],
+                overall_retention["month1_pct"],
+            )
             
-            with col_ret1:
-                st.markdown(
-                    create_metric_card(
+            render_metric_row(
+                [
+                    (
                         "Day 1 Retention",
                         f"{day1_ret:.1f}%",
                         "Users returning the next day",
                         "azure",
                         "📱",
                     ),
-                    unsafe_allow_html=True,
-                )
-            
-            with col_ret2:
-                st.markdown(
-                    create_metric_card(
+                    (
                         "Week 1 Retention",
                         f"{week1_ret:.1f}%",
                         "Users returning within a week",
                         "azure",
                         "🗓️",
                     ),
-                    unsafe_allow_html=True,
-                )
-            
-            with col_ret3:
-                st.markdown(
-                    create_metric_card(
+                    (
                         "Month 1 Retention",
                         f"{month1_ret:.1f}%",
                         "Users returning within a month",
                         "azure",
                         "📊",
                     ),
-                    unsafe_allow_html=True,
-                )
+                ]
+            )
 
-        # Row 5: Enhanced Feature Usage Patterns & Analytics
-        st.subheader("🎯 Feature Usage Patterns & Analytics")
+        # Rows 5-7 read the comprehensive metrics, which are empty if their query failed
+        if comprehensive:
+            # Row 5: Enhanced Feature Usage Patterns & Analytics
+            st.subheader("🎯 Feature Usage Patterns & Analytics")
         
-        # Get feature usage analysis
-        feature_analysis = analyze_feature_usage_patterns(comprehensive_df)
+            # Get feature usage analysis
+            feature_analysis = analyze_feature_usage_patterns(comprehensive)
         
-        # Single vs Multiple Feature Users
-        col_pattern1, col_pattern2 = st.columns(2)
-
-        with col_pattern1:
+            # Single vs Multiple Feature Users
             # Calculate single feature users with insights
-            single_feature_users = comprehensive_df['single_feature_users'][0] if 'single_feature_users' in comprehensive_df.columns else 0
-            total_active_for_patterns = comprehensive_df['total_active_users'][0]
+            single_feature_users = comprehensive.get('single_feature_users', 0)
+            total_active_for_patterns = comprehensive['total_active_users']
             single_feature_pct = (single_feature_users / total_active_for_patterns * 100) if total_active_for_patterns > 0 else 0
-            
+
             # Determine alert level for single feature users
             alert_level = "medium" if single_feature_pct > 60 else "low" if single_feature_pct < 40 else "info"
             additional_insight = f"Opportunity to cross-sell other features" if single_feature_pct > 50 else "Good feature adoption balance"
-            
+
             single_html = create_metric_card(
                 "Single Feature Users",
                 f"{single_feature_users:,}",
@@ -2041,17 +2125,15 @@ with tab1:
                 alert_level=alert_level,
                 additional_insight=additional_insight
             )
-            components.html(single_html, height=200)
 
-        with col_pattern2:
             # Calculate multiple feature users with insights
-            multiple_feature_users = comprehensive_df['multiple_feature_users'][0] if 'multiple_feature_users' in comprehensive_df.columns else 0
+            multiple_feature_users = comprehensive.get('multiple_feature_users', 0)
             multiple_feature_pct = (multiple_feature_users / total_active_for_patterns * 100) if total_active_for_patterns > 0 else 0
-            
+
             # Determine alert level for multiple feature users
             alert_level = "low" if multiple_feature_pct > 40 else "medium" if multiple_feature_pct < 20 else "info"
             additional_insight = f"High engagement users - focus on retention" if multiple_feature_pct > 40 else "Potential to increase feature adoption"
-            
+
             multiple_html = create_metric_card(
                 "Multiple Feature Users",
                 f"{multiple_feature_users:,}",
@@ -2061,25 +2143,23 @@ with tab1:
                 alert_level=alert_level,
                 additional_insight=additional_insight
             )
-            components.html(multiple_html, height=200)
-        
-        # Row 6: Most/Least Used Features
-        st.subheader("📊 Feature Usage Rankings")
-        col_rank1, col_rank2 = st.columns(2)
-        
-        if feature_analysis:
-            analysis = feature_analysis[0]
-            
-            with col_rank1:
+            render_metric_row([single_html, multiple_html])
+
+            # Row 6: Most/Least Used Features
+            st.subheader("📊 Feature Usage Rankings")
+
+            if feature_analysis:
+                analysis = feature_analysis[0]
+
                 # Most used feature
                 most_used = analysis['most_used_feature']
                 most_used_count = analysis['most_used_count']
                 most_used_pct = analysis['most_used_pct']
-                
+
                 # Determine alert level
                 alert_level = "low" if most_used_pct > 60 else "info"
                 additional_insight = f"Leading feature - leverage for marketing campaigns"
-                
+
                 most_used_html = create_metric_card(
                     f"Most Used Feature: {most_used}",
                     f"{most_used_count:,}",
@@ -2089,18 +2169,16 @@ with tab1:
                     alert_level=alert_level,
                     additional_insight=additional_insight
                 )
-                components.html(most_used_html, height=200)
-            
-            with col_rank2:
+
                 # Least used feature
                 least_used = analysis['least_used_feature']
                 least_used_count = analysis['least_used_count']
                 least_used_pct = analysis['least_used_pct']
-                
+
                 # Determine alert level
                 alert_level = "high" if least_used_pct < 15 else "medium" if least_used_pct < 25 else "info"
                 additional_insight = f"Focus on improving {least_used.lower()} adoption" if least_used_pct < 20 else "Consider feature enhancement"
-                
+
                 least_used_html = create_metric_card(
                     f"Least Used Feature: {least_used}",
                     f"{least_used_count:,}",
@@ -2110,20 +2188,26 @@ with tab1:
                     alert_level=alert_level,
                     additional_insight=additional_insight
                 )
-                components.html(least_used_html, height=200)
-        
-        # Row 7: Single Feature Specific Users
-        st.subheader("🎯 Single Feature Specific Users")
-        col_single1, col_single2, col_single3, col_single4 = st.columns(4)
-        
-        # Only Spending Users
-        with col_single1:
-            only_spending = comprehensive_df['only_spending_users'][0] if 'only_spending_users' in comprehensive_df.columns else 0
-            spending_pct = (only_spending / total_active_for_patterns * 100) if total_active_for_patterns > 0 else 0
-            
+                render_metric_row([most_used_html, least_used_html])
+
+            # Row 7: Single Feature Specific Users
+            st.subheader("🎯 Single Feature Specific Users")
+
+            # Single-feature shares in one vector division, as for the Row 4 cards
+            only_counts = np.fromiter(
+                (comprehensive.get(key, 0) for key in ONLY_FEATURE_KEYS), dtype=np.int64, count=len(ONLY_FEATURE_KEYS)
+            )
+            only_spending, only_lady_ai, only_savings, only_investment = only_counts.tolist()
+            only_pct = (
+                only_counts.astype(np.float64) * (100.0 / total_active_for_patterns)
+                if total_active_for_patterns > 0 else np.zeros(len(only_counts))
+            )
+            spending_pct, lady_ai_pct, savings_pct, investment_pct = only_pct.tolist()
+
+            # Only Spending Users
             alert_level = "info" if spending_pct > 10 else "medium"
             additional_insight = "Cross-sell savings/investment features" if spending_pct > 15 else "Normal spending-only user segment"
-            
+
             only_spending_html = create_metric_card(
                 "Only Spending Users",
                 f"{only_spending:,}",
@@ -2133,16 +2217,11 @@ with tab1:
                 alert_level=alert_level,
                 additional_insight=additional_insight
             )
-            components.html(only_spending_html, height=200)
-        
-        # Only Lady AI Users
-        with col_single2:
-            only_lady_ai = comprehensive_df['only_lady_ai_users'][0] if 'only_lady_ai_users' in comprehensive_df.columns else 0
-            lady_ai_pct = (only_lady_ai / total_active_for_patterns * 100) if total_active_for_patterns > 0 else 0
-            
+
+            # Only Lady AI Users
             alert_level = "info" if lady_ai_pct > 5 else "medium"
             additional_insight = "Engage with financial planning features" if lady_ai_pct > 10 else "AI-only users segment"
-            
+
             only_lady_ai_html = create_metric_card(
                 "Only Lady AI Users",
                 f"{only_lady_ai:,}",
@@ -2152,16 +2231,11 @@ with tab1:
                 alert_level=alert_level,
                 additional_insight=additional_insight
             )
-            components.html(only_lady_ai_html, height=200)
-        
-        # Only Savings Users
-        with col_single3:
-            only_savings = comprehensive_df['only_savings_users'][0] if 'only_savings_users' in comprehensive_df.columns else 0
-            savings_pct = (only_savings / total_active_for_patterns * 100) if total_active_for_patterns > 0 else 0
-            
+
+            # Only Savings Users
             alert_level = "info" if savings_pct > 8 else "medium"
             additional_insight = "Introduce spending tracking" if savings_pct > 12 else "Savings-focused user segment"
-            
+
             only_savings_html = create_metric_card(
                 "Only Savings Users",
                 f"{only_savings:,}",
@@ -2171,16 +2245,11 @@ with tab1:
                 alert_level=alert_level,
                 additional_insight=additional_insight
             )
-            components.html(only_savings_html, height=200)
-        
-        # Only Investment Users
-        with col_single4:
-            only_investment = comprehensive_df['only_investment_users'][0] if 'only_investment_users' in comprehensive_df.columns else 0
-            investment_pct = (only_investment / total_active_for_patterns * 100) if total_active_for_patterns > 0 else 0
-            
+
+            # Only Investment Users
             alert_level = "info" if investment_pct > 3 else "medium"
             additional_insight = "High-value users - premium features" if investment_pct > 5 else "Investment-focused segment"
-            
+
             only_investment_html = create_metric_card(
                 "Only Investment Users",
                 f"{only_investment:,}",
@@ -2190,431 +2259,319 @@ with tab1:
                 alert_level=alert_level,
                 additional_insight=additional_insight
             )
-            components.html(only_investment_html, height=200)
-        
+            render_metric_row([only_spending_html, only_lady_ai_html, only_savings_html, only_investment_html])
+
         # Row 8: Feature Combinations Analysis
         st.subheader("🔄 Multiple Feature Combinations")
-        
-        # Fetch feature combinations data
-        feature_combinations_df = fetch_feature_combinations(start_date, end_date)
-        
+
         if not feature_combinations_df.empty:
             # Most popular combination metric card
-            most_popular_combo = feature_combinations_df.iloc[0]
-            combo_name = most_popular_combo['feature_combination']
-            combo_count = most_popular_combo['user_count']
-            combo_pct = most_popular_combo['percentage']
-            
-            col_combo1, col_combo2 = st.columns(2)
-            
-            with col_combo1:
-                most_popular_html = create_metric_card(
-                    f"Most Popular Combination",
-                    f"{combo_count:,}",
-                    f"{combo_name} ({combo_pct:.1f}% of multi-feature users)",
-                    "purple",
-                    "🔥",
-                    alert_level="low",
-                    additional_insight="Focus marketing on this combination"
-                )
-                components.html(most_popular_html, height=200)
-            
-            with col_combo2:
-                # Show total combinations count
-                total_combinations = len(feature_combinations_df)
-                total_combinations_html = create_metric_card(
-                    "Total Combinations",
-                    f"{total_combinations}",
-                    "Different feature combinations used",
-                    "blue",
-                    "🎭",
-                    alert_level="info",
-                    additional_insight="Shows user behavior diversity"
-                )
-                components.html(total_combinations_html, height=200)
+            combo_name = feature_combinations_df['feature_combination'].iat[0]
+            combo_count = feature_combinations_df['user_count'].iat[0]
+            combo_pct = feature_combinations_df['percentage'].iat[0]
             
+            most_popular_html = create_metric_card(
+                f"Most Popular Combination",
+                f"{combo_count:,}",
+                f"{combo_name} ({combo_pct:.1f}% of multi-feature users)",
+                "purple",
+                "🔥",
+                alert_level="low",
+                additional_insight="Focus marketing on this combination"
+            )
+
+            # Show total combinations count
+            total_combinations = len(feature_combinations_df)
+            total_combinations_html = create_metric_card(
+                "Total Combinations",
+                f"{total_combinations}",
+                "Different feature combinations used",
+                "blue",
+                "🎭",
+                alert_level="info",
+                additional_insight="Shows user behavior diversity"
+            )
+            render_metric_row([most_popular_html, total_combinations_html])
+
             # Expandable table for feature combinations
             with st.expander("📋 View All Feature Combinations", expanded=False):
                 st.markdown("**Feature Combination Breakdown for Multiple Feature Users**")
                 
                 # Style the dataframe
-                styled_df = feature_combinations_df.copy()
-                styled_df['feature_combination'] = styled_df['feature_combination'].str.replace(' + ', ' + ', regex=False)
-                styled_df = styled_df.rename(columns={
+                styled_df = feature_combinations_df.rename(columns={
                     'feature_combination': 'Feature Combination',
                     'user_count': 'Users',
                     'percentage': '% of Multi-Feature Users'
                 })
                 
-                # Add color coding based on usage
-                def highlight_rows(row):
-                    if row.name == 0:  # Most popular
-                        return ['background-color: #E8F5E8'] * len(row)
-                    elif row['% of Multi-Feature Users'] > 15:  # High usage
-                        return ['background-color: #F0F8FF'] * len(row)
-                    else:
-                        return [''] * len(row)
+                # Add color coding based on usage, built for the whole table in one call
+                def highlight_rows(df):
+                    row_css = np.where(
+                        df.index == 0,  # Most popular
+                        'background-color: #E8F5E8',
+                        np.where(df['% of Multi-Feature Users'] > 15, 'background-color: #F0F8FF', ''),  # High usage
+                    )
+                    return pd.DataFrame(
+                        np.repeat(row_css[:, None], df.shape[1], axis=1), index=df.index, columns=df.columns
+                    )
                 
-                styled_df = styled_df.style.apply(highlight_rows, axis=1)
+                styled_df = styled_df.style.apply(highlight_rows, axis=None)
                 st.dataframe(styled_df, use_container_width=True)
                 
                 # Add insights about combinations
                 if len(feature_combinations_df) > 1:
-                    second_popular = feature_combinations_df.iloc[1]
-                    st.info(f"💡 **Insight**: The top 2 combinations ({combo_name} and {second_popular['feature_combination']}) represent {combo_pct + second_popular['percentage']:.1f}% of all multi-feature users.")
+                    second_name = feature_combinations_df['feature_combination'].iat[1]
+                    second_pct = feature_combinations_df['percentage'].iat[1]
+                    st.info(f"💡 **Insight**: The top 2 combinations ({combo_name} and {second_name}) represent {combo_pct + second_pct:.1f}% of all multi-feature users.")
         else:
             st.info("No multiple feature combinations found for the selected period.")
     # Generate and display insights
-    retention_df = fetch_retention_metrics(start_date, end_date)
-    insights = generate_insights(comprehensive_df, retention_df)
+    insights = generate_insights(comprehensive, overall_retention)
 
     if insights:
         st.subheader("💡 Retention Insights")
-        for insight in insights:
-            st.markdown(
-                create_insight_card(
-                    insight["title"],
-                    insight["insight"],
-                    insight["recommendation"],
-                    insight["icon"],
-                ),
-                unsafe_allow_html=True,
-            )
+        render_insight_cards(insights)
 
     # Cross-Feature Comparison removed per request
-# Feature-specific tabs
-for tab, feature, feature_name in [
-    (tab2, "spending", "Spending"),
-    (tab3, "lady_ai", "Lady AI"),
-    (tab4, "savings", "Savings"),
-    (tab5, "investment", "Investment"),
-]:
-    with tab:
-        st.markdown('<div class="feature-section">', unsafe_allow_html=True)
-        st.subheader(f"{feature_name} Deep Dive Analytics")
-
-        # Fetch feature-specific metrics
-        feature_metrics = fetch_feature_specific_metrics(start_date, end_date, feature)
-        feature_retention = fetch_retention_metrics(start_date, end_date, feature)
-
-        if not feature_metrics.empty:
-            # Calculate stickiness
-            avg_dau = (
-                feature_metrics["avg_dau"][0]
-                if not pd.isna(feature_metrics["avg_dau"][0])
-                else 0
-            )
-            avg_wau = (
-                feature_metrics["avg_wau"][0]
-                if not pd.isna(feature_metrics["avg_wau"][0])
-                else 0
-            )
-            avg_mau = (
-                feature_metrics["avg_mau"][0]
-                if not pd.isna(feature_metrics["avg_mau"][0])
-                else 0
-            )
-            stickiness_ratio = avg_dau / avg_mau if avg_mau > 0 else 0
 
-            # Get feature color
-            feature_color = FEATURE_COLORS.get(feature, "navy")
 
-            # Core metrics row
-            col1, col2, col3, col4 = st.columns(4)
+@st.fragment
+def render_feature_tab(feature, feature_name, feature_metrics, feature_retention, feature_trends):
+    st.subheader(f"{feature_name} Deep Dive Analytics")
 
-            with col1:
-                st.markdown(
-                    create_metric_card(
-                        f"{feature_name} Active Users",
-                        f"{feature_metrics['total_active_users'][0]:,}",
-                        f"Total users active in {feature_name.lower()}",
-                        feature_color,
-                        "👥",
-                    ),
-                    unsafe_allow_html=True,
-                )
+    if not feature_metrics.empty:
+        # Read the single metrics row once; missing aggregates count as zero
+        row = feature_metrics.iloc[0].fillna(0)
+        avg_dau, avg_wau, avg_mau = row.avg_dau, row.avg_wau, row.avg_mau
+        # The row upcasts to float alongside the averages, so restore the counts to ints
+        total_active, first_time, recurring = (
+            int(row.total_active_users),
+            int(row.first_time_users),
+            int(row.recurring_users),
+        )
 
-            with col2:
-                st.markdown(
-                    create_metric_card(
-                        "One Time Usage Users",
-                        f"{feature_metrics['first_time_users'][0]:,}",
-                        f"Users active on exactly one day in {feature_name.lower()}",
-                        feature_color,
-                        "📅",
-                    ),
-                    unsafe_allow_html=True,
-                )
+        # Calculate stickiness
+        stickiness_ratio = avg_dau / avg_mau if avg_mau > 0 else 0
+
+        # Get feature color
+        feature_color = FEATURE_COLORS.get(feature, "navy")
+
+        # Core metrics row
+        render_metric_row(
+            [
+                (
+                    f"{feature_name} Active Users",
+                    f"{total_active:,}",
+                    f"Total users active in {feature_name.lower()}",
+                    feature_color,
+                    "👥",
+                ),
+                (
+                    "One Time Usage Users",
+                    f"{first_time:,}",
+                    f"Users active on exactly one day in {feature_name.lower()}",
+                    feature_color,
+                    "📅",
+                ),
+                (
+                    "Recurring Users",
+                    f"{recurring:,}",
+                    f"Multi-day {feature_name.lower()} users",
+                    feature_color,
+                    "🔄",
+                ),
+                (
+                    "Stickiness Ratio",
+                    f"{stickiness_ratio:.2f}",
+                    "DAU/MAU engagement ratio",
+                    feature_color,
+                    "🎯",
+                ),
+            ]
+        )
 
-            with col3:
-                st.markdown(
-                    create_metric_card(
-                        "Recurring Users",
-                        f"{feature_metrics['recurring_users'][0]:,}",
-                        f"Multi-day {feature_name.lower()} users",
-                        feature_color,
-                        "🔄",
-                    ),
-                    unsafe_allow_html=True,
-                )
+        # Engagement metrics row
+        st.subheader(f"📊 {feature_name} Engagement Metrics")
+        render_metric_row(
+            [
+                (
+                    "Average DAU",
+                    f"{avg_dau:,.0f}",
+                    f"Daily active {feature_name.lower()} users",
+                    feature_color,
+                    "📅",
+                ),
+                (
+                    "Average WAU",
+                    f"{avg_wau:,.0f}",
+                    f"Weekly active {feature_name.lower()} users",
+                    feature_color,
+                    "📆",
+                ),
+                (
+                    "Average MAU",
+                    f"{avg_mau:,.0f}",
+                    f"Monthly active {feature_name.lower()} users",
+                    feature_color,
+                    "🗓️",
+                ),
+            ]
+        )
 
-            with col4:
-                st.markdown(
-                    create_metric_card(
-                        "Stickiness Ratio",
-                        f"{stickiness_ratio:.2f}",
-                        "DAU/MAU engagement ratio",
-                        feature_color,
-                        "🎯",
-                    ),
-                    unsafe_allow_html=True,
-                )
+        # Retention metrics
+        if not feature_retention.empty:
+            st.subheader(f"🔄 {feature_name} Retention Analysis")
 
-            # Engagement metrics row
-            st.subheader(f"📊 {feature_name} Engagement Metrics")
-            col5, col6, col7 = st.columns(3)
+            retention_row = feature_retention.iloc[0]
+            day1_ret, week1_ret, month1_ret = retention_row.day1_pct, retention_row.week1_pct, retention_row.month1_pct
 
-            with col5:
-                st.markdown(
-                    create_metric_card(
-                        "Average DAU",
-                        f"{avg_dau:,.0f}",
-                        f"Daily active {feature_name.lower()} users",
+            render_metric_row(
+                [
+                    (
+                        "Day 1 Retention",
+                        f"{day1_ret:.1f}%",
+                        "Users returning next day",
                         feature_color,
-                        "📅",
+                        "📱",
                     ),
-                    unsafe_allow_html=True,
-                )
-
-            with col6:
-                st.markdown(
-                    create_metric_card(
-                        "Average WAU",
-                        f"{avg_wau:,.0f}",
-                        f"Weekly active {feature_name.lower()} users",
+                    (
+                        "Week 1 Retention",
+                        f"{week1_ret:.1f}%",
+                        "Users returning within a week",
                         feature_color,
-                        "📆",
+                        "🗓️",
                     ),
-                    unsafe_allow_html=True,
-                )
-
-            with col7:
-                st.markdown(
-                    create_metric_card(
-                        "Average MAU",
-                        f"{avg_mau:,.0f}",
-                        f"Monthly active {feature_name.lower()} users",
+                    (
+                        "Month 1 Retention",
+                        f"{month1_ret:.1f}%",
+                        "Users returning within a month",
                         feature_color,
-                        "🗓️",
+                        "📊",
                     ),
-                    unsafe_allow_html=True,
-                )
-
-            # Retention metrics
-            if not feature_retention.empty:
-                st.subheader(f"🔄 {feature_name} Retention Analysis")
-                col8, col9, col10 = st.columns(3)
+                ]
+            )
 
-                day1_ret = (
-                    feature_retention["day1_retention"][0] * 100
-                    if feature_retention["day1_retention"][0]
-                    else 0
+        # Trend Charts
+        st.subheader(f"📈 {feature_name} Usage Trends")
+        dau_df, wau_df, mau_df = feature_trends
+
+        if not dau_df.empty:
+            # Daily trend
+            # Built from graph_objects directly: skips plotly.express' frame
+            # introspection; long daily series are thinned with LTTB first
+            dau_x, dau_y = downsample_lttb(dau_df["activity_date"].to_numpy(), dau_df["dau"].to_numpy())
+            fig_dau = go.Figure(
+                go.Scatter(
+                    x=dau_x,
+                    y=dau_y,
+                    mode="lines",
+                    name="DAU",
+                    line=dict(color=LADDER_COLORS[feature_color]),
                 )
-                week1_ret = (
-                    feature_retention["week1_retention"][0] * 100
-                    if feature_retention["week1_retention"][0]
-                    else 0
+            )
+            fig_dau.update_layout(
+                title=f"{feature_name} Daily Active Users",
+                xaxis_title="Date",
+                yaxis_title="Daily Active Users",
+                hovermode="x unified",
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+            )
+            st.plotly_chart(fig_dau, use_container_width=True)
+
+        if not wau_df.empty:
+            # Weekly trend
+            fig_wau = go.Figure(
+                go.Bar(
+                    x=wau_df["week"].to_numpy(),
+                    y=wau_df["wau"].to_numpy(),
+                    name="WAU",
+                    marker_color=LADDER_COLORS[feature_color],
                 )
-                month1_ret = (
-                    feature_retention["month1_retention"][0] * 100
-                    if feature_retention["month1_retention"][0]
-                    else 0
+            )
+            fig_wau.update_layout(
+                title=f"{feature_name} Weekly Active Users",
+                xaxis_title="Week",
+                yaxis_title="Weekly Active Users",
+                showlegend=False,
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+            )
+            st.plotly_chart(fig_wau, use_container_width=True)
+
+        if not mau_df.empty and len(mau_df) > 1:
+            # Monthly trend
+            fig_mau = go.Figure(
+                go.Scatter(
+                    x=mau_df["month"].to_numpy(),
+                    y=mau_df["mau"].to_numpy(),
+                    mode="lines+markers",
+                    name="MAU",
+                    line=dict(color=LADDER_COLORS[feature_color]),
                 )
+            )
+            fig_mau.update_layout(
+                title=f"{feature_name} Monthly Active Users",
+                xaxis_title="Month",
+                yaxis_title="Monthly Active Users",
+                hovermode="x unified",
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+            )
+            st.plotly_chart(fig_mau, use_container_width=True)
+
+    # Feature-specific insights
+    # The feature rows are slices of the all-feature frames, so hand over their single rows as dicts
+    feature_insights = generate_insights(
+        {} if feature_metrics.empty else feature_metrics.iloc[0].to_dict(),
+        {} if feature_retention.empty else feature_retention.iloc[0].to_dict(),
+        feature,
+    )
+    if feature_insights:
+        st.subheader(f"💡 {feature_name} Insights")
+        render_insight_cards(feature_insights)
 
-                with col8:
-                    st.markdown(
-                        create_metric_card(
-                            "Day 1 Retention",
-                            f"{day1_ret:.1f}%",
-                            "Users returning next day",
-                            feature_color,
-                            "📱",
-                        ),
-                        unsafe_allow_html=True,
-                    )
-
-                with col9:
-                    st.markdown(
-                        create_metric_card(
-                            "Week 1 Retention",
-                            f"{week1_ret:.1f}%",
-                            "Users returning within a week",
-                            feature_color,
-                            "🗓️",
-                        ),
-                        unsafe_allow_html=True,
-                    )
-
-                with col10:
-                    st.markdown(
-                        create_metric_card(
-                            "Month 1 Retention",
-                            f"{month1_ret:.1f}%",
-                            "Users returning within a month",
-                            feature_color,
-                            "📊",
-                        ),
-                        unsafe_allow_html=True,
-                    )
-
-            # Trend Charts
-            st.subheader(f"📈 {feature_name} Usage Trends")
-            dau_df, wau_df, mau_df = fetch_trend_data(start_date, end_date, feature)
-
-            if not dau_df.empty:
-                # Daily trend
-                fig_dau = px.line(
-                    dau_df,
-                    x="activity_date",
-                    y="dau",
-                    title=f"{feature_name} Daily Active Users",
-                    color_discrete_sequence=[LADDER_COLORS[feature_color]],
-                )
-                fig_dau.update_layout(
-                    xaxis_title="Date",
-                    yaxis_title="Daily Active Users",
-                    hovermode="x unified",
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    paper_bgcolor="rgba(0,0,0,0)",
-                )
-                st.plotly_chart(fig_dau, use_container_width=True)
-
-            if not wau_df.empty:
-                # Weekly trend
-                fig_wau = px.bar(
-                    wau_df,
-                    x="week",
-                    y="wau",
-                    title=f"{feature_name} Weekly Active Users",
-                    color_discrete_sequence=[LADDER_COLORS[feature_color]],
-                )
-                fig_wau.update_layout(
-                    xaxis_title="Week",
-                    yaxis_title="Weekly Active Users",
-                    showlegend=False,
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    paper_bgcolor="rgba(0,0,0,0)",
-                )
-                st.plotly_chart(fig_wau, use_container_width=True)
-
-            if not mau_df.empty and len(mau_df) > 1:
-                # Monthly trend
-                fig_mau = px.line(
-                    mau_df,
-                    x="month",
-                    y="mau",
-                    title=f"{feature_name} Monthly Active Users",
-                    color_discrete_sequence=[LADDER_COLORS[feature_color]],
-                    markers=True,
-                )
-                fig_mau.update_layout(
-                    xaxis_title="Month",
-                    yaxis_title="Monthly Active Users",
-                    hovermode="x unified",
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    paper_bgcolor="rgba(0,0,0,0)",
-                )
-                st.plotly_chart(fig_mau, use_container_width=True)
 
-        # Feature-specific insights
-        feature_insights = generate_insights(
-            feature_metrics, feature_retention, feature
-        )
-        if feature_insights:
-            st.subheader(f"💡 {feature_name} Insights")
-            for insight in feature_insights:
-                st.markdown(
-                    create_insight_card(
-                        insight["title"],
-                        insight["insight"],
-                        insight["recommendation"],
-                        insight["icon"],
-                    ),
-                    unsafe_allow_html=True,
-                )
+# FFP Engagement Dashboard Tab
+FEEDBACK_PREVIEW_LIMIT = 200
 
-        st.markdown("</div>", unsafe_allow_html=True)
 
-# FFP Engagement Dashboard Tab
-with tab6:
-    st.markdown('<div class="feature-section">', unsafe_allow_html=True)
+@st.fragment
+def render_ffp_tab(start_date, end_date):
     st.subheader("📋 Free Financial Plan (FFP) Engagement Dashboard")
     st.markdown(
         "Gain actionable insights into how users interact with the Free Financial Plan experience."
     )
 
-    # Load FFP data
-    ffp_df, feedback_df = load_ffp_data()
-
-    if not ffp_df.empty:
-        # Convert dates
-        ffp_df["created_at"] = pd.to_datetime(ffp_df["created_at"])
-        if not feedback_df.empty:
-            feedback_df["created_at"] = pd.to_datetime(feedback_df["created_at"])
-
-        # Apply date filter
-        filtered_ffp = ffp_df[
-            (ffp_df["created_at"].dt.date >= start_date)
-            & (ffp_df["created_at"].dt.date <= end_date)
-        ]
-        filtered_feedback = (
-            feedback_df[
-                (feedback_df["created_at"].dt.date >= start_date)
-                & (feedback_df["created_at"].dt.date <= end_date)
-            ]
-            if not feedback_df.empty
-            else feedback_df
-        )
+    # Load FFP data, already limited to the selected period by the database
+    filtered_ffp, filtered_feedback = load_ffp_data(start_date, end_date)
 
+    if not filtered_ffp.empty:
         # FFP Metrics
-        col1, col2 = st.columns(2)
-        with col1:
-            parsed_metadata = filtered_ffp["metadata"].apply(parse_ffp_metadata)
-            total_completed = parsed_metadata.apply(
-                lambda x: len([v for v in x.values() if v not in (None, "", [], {})])
-            )
-            completed_surveys = (total_completed == total_completed.max()).sum()
-            st.markdown(
-                create_metric_card(
+        total_completed = filtered_ffp["answered_questions"]
+        completed_surveys = (total_completed == total_completed.max()).sum()
+        render_metric_row(
+            [
+                (
                     "✅ Completed Surveys",
                     f"{completed_surveys:,}",
                     f"All questions completed ({start_date} to {end_date})",
                     "navy",
                     "📋",
                 ),
-                unsafe_allow_html=True,
-            )
-
-        with col2:
-            st.markdown(
-                create_metric_card(
+                (
                     "📥 Total Submissions",
                     f"{len(filtered_ffp):,}",
                     f"Total FFP submissions ({start_date} to {end_date})",
                     "navy",
                     "📊",
                 ),
-                unsafe_allow_html=True,
-            )
+            ]
+        )
 
         # Engagement Trends
         st.subheader("📊 Engagement Over Time and User Feedback")
-        trend_df = (
-            filtered_ffp.groupby(filtered_ffp["created_at"].dt.date)
-            .size()
-            .reset_index(name="Submissions")
-        )
-        trend_df = trend_df.rename(columns={"created_at": "Date"})
+        trend_df = fetch_ffp_daily_submissions(start_date, end_date)
 
         col1, col2 = st.columns(2)
         with col1:
@@ -2629,18 +2586,27 @@ with tab6:
 
             # User Comments
             st.subheader("💭 User Feedback")
-            for _, row in filtered_feedback.iterrows():
-                st.markdown(
-                    f"- **{row['reaction'].capitalize()}** — {row['comment']} *(on {row['created_at'].date()})*"
-                )
+            # One markdown element for the whole list instead of one per comment;
+            # the lines are assembled column-wise rather than row by row. Every part is
+            # NA-filled, since one missing value would turn its whole line into NA
+            feedback_lines = (
+                "- **" + filtered_feedback["reaction"].fillna("").astype(str).str.capitalize()
+                + "** — " + filtered_feedback["comment"].fillna("").astype(str)
+                + " *(on " + filtered_feedback["created_at"].dt.strftime("%Y-%m-%d").fillna("") + ")*"
+            ).tolist()
+            st.markdown("\n".join(feedback_lines[:FEEDBACK_PREVIEW_LIMIT]))
+            if len(feedback_lines) > FEEDBACK_PREVIEW_LIMIT:
+                with st.expander(f"Show all {len(feedback_lines):,} comments"):
+                    st.markdown("\n".join(feedback_lines[FEEDBACK_PREVIEW_LIMIT:]))
         else:
             st.info("No feedback data available for the selected period.")
+    else:
+        st.info("No FFP submissions found for the selected period.")
 
-    st.markdown("</div>", unsafe_allow_html=True)
 
 # Customer Feature Analysis Tab
-with tab7:
-    st.markdown('<div class="feature-section">', unsafe_allow_html=True)
+@st.fragment
+def render_dormant_tab(start_date, end_date):
     st.subheader("🔍 Customer Feature Analysis Dashboard")
     st.markdown(
         "Identify and analyze users who have used features before but haven't been active recently. "
@@ -2680,116 +2646,121 @@ with tab7:
         else:
             dormant_period_days = dormant_period_options[dormant_choice]
 
-    # Fetch dormant users analysis
-    dormant_analysis = fetch_dormant_users_analysis(start_date, end_date, dormant_period_days)
+    # Fetch dormant users analysis alongside the churn count and trend it is shown with
+    dormant_analysis, churn_count, dormant_trend = run_parallel(
+        partial(fetch_dormant_users_analysis, start_date, end_date, dormant_period_days),
+        partial(fetch_churn_count, start_date, end_date),
+        partial(fetch_dormant_users_trend, start_date, end_date, dormant_period_days),
+    )
     
-    if not dormant_analysis.empty:
+    if dormant_analysis:
         # Overall Dormant Users Section
         st.subheader("📊 Overall Dormant Users Analysis")
         
-        col_overall1, col_overall2, col_overall3 = st.columns(3)
-        
-        with col_overall1:
-            overall_dormant = dormant_analysis['overall_dormant_users'][0]
-            total_historical = dormant_analysis['total_historical_users'][0]
-            dormant_percentage = (overall_dormant / total_historical * 100) if total_historical > 0 else 0
-            
-            # Determine alert level
-            alert_level = "high" if dormant_percentage > 40 else "medium" if dormant_percentage > 20 else "low"
-            additional_insight = f"Critical: {dormant_percentage:.1f}% of historical users are dormant" if dormant_percentage > 40 else f"Moderate: {dormant_percentage:.1f}% dormant users" if dormant_percentage > 20 else f"Good: Only {dormant_percentage:.1f}% dormant users"
-            
-            overall_html = create_metric_card(
-                "Overall Dormant Users",
-                f"{overall_dormant:,}",
-                f"{dormant_percentage:.1f}% of {total_historical:,} historical users",
-                "red" if dormant_percentage > 40 else "orange" if dormant_percentage > 20 else "green",
-                "😴",
-                alert_level=alert_level,
-                additional_insight=additional_insight
-            )
-            components.html(overall_html, height=200)
-        
-        with col_overall2:
-            total_current = dormant_analysis['total_current_users'][0]
-            reactivation_rate = ((total_current - overall_dormant) / total_historical * 100) if total_historical > 0 else 0
-            
-            alert_level = "low" if reactivation_rate > 60 else "medium" if reactivation_rate > 40 else "high"
-            additional_insight = f"Strong user retention" if reactivation_rate > 60 else f"Moderate retention" if reactivation_rate > 40 else f"Focus on re-engagement"
-            
-            reactivation_html = create_metric_card(
-                "User Reactivation Rate",
-                f"{reactivation_rate:.1f}%",
-                f"Active users from historical base",
-                "green" if reactivation_rate > 60 else "orange" if reactivation_rate > 40 else "red",
-                "🔄",
-                alert_level=alert_level,
-                additional_insight=additional_insight
-            )
-            components.html(reactivation_html, height=200)
-        
-        with col_overall3:
-            # Churn count based on selected date range
-            churn_count = fetch_churn_count(start_date, end_date)
-            churn_html = create_metric_card(
-                "User Churn",
-                f"{churn_count:,}",
-                f"Users with no activity between {start_date} and {end_date}",
-                "red",
-                "📉"
-            )
-            components.html(churn_html, height=200)
+        overall_dormant = dormant_analysis['overall_dormant_users']
+        total_historical = dormant_analysis['total_historical_users']
+        dormant_percentage = (overall_dormant / total_historical * 100) if total_historical > 0 else 0
+
+        # Determine alert level
+        alert_level = "high" if dormant_percentage > 40 else "medium" if dormant_percentage > 20 else "low"
+        additional_insight = f"Critical: {dormant_percentage:.1f}% of historical users are dormant" if dormant_percentage > 40 else f"Moderate: {dormant_percentage:.1f}% dormant users" if dormant_percentage > 20 else f"Good: Only {dormant_percentage:.1f}% dormant users"
+
+        overall_html = create_metric_card(
+            "Overall Dormant Users",
+            f"{overall_dormant:,}",
+            f"{dormant_percentage:.1f}% of {total_historical:,} historical users",
+            "red" if dormant_percentage > 40 else "orange" if dormant_percentage > 20 else "green",
+            "😴",
+            alert_level=alert_level,
+            additional_insight=additional_insight
+        )
+
+        total_current = dormant_analysis['total_current_users']
+        reactivation_rate = ((total_current - overall_dormant) / total_historical * 100) if total_historical > 0 else 0
+
+        alert_level = "low" if reactivation_rate > 60 else "medium" if reactivation_rate > 40 else "high"
+        additional_insight = f"Strong user retention" if reactivation_rate > 60 else f"Moderate retention" if reactivation_rate > 40 else f"Focus on re-engagement"
+
+        reactivation_html = create_metric_card(
+            "User Reactivation Rate",
+            f"{reactivation_rate:.1f}%",
+            f"Active users from historical base",
+            "green" if reactivation_rate > 60 else "orange" if reactivation_rate > 40 else "red",
+            "🔄",
+            alert_level=alert_level,
+            additional_insight=additional_insight
+        )
+
+        # Churn count based on selected date range
+        churn_html = create_metric_card(
+            "User Churn",
+            f"{churn_count:,}",
+            f"Users with no activity between {start_date} and {end_date}",
+            "red",
+            "📉"
+        )
+        render_metric_row([overall_html, reactivation_html, churn_html])
 
         # Feature-Specific Dormant Users Section
         st.subheader("🎯 Feature-Specific Dormant Users")
         
         # Create feature-specific metric cards
-        col_feature1, col_feature2, col_feature3, col_feature4 = st.columns(4)
-        
         features_data = [
             ("spending", "Spending", "blue", "💰"),
             ("savings", "Savings", "green", "🏦"),
             ("investment", "Investment", "purple", "📈"),
             ("lady_ai", "Lady AI", "orange", "🤖")
         ]
-        
-        for i, (feature_key, feature_name, color, icon) in enumerate(features_data):
-            with [col_feature1, col_feature2, col_feature3, col_feature4][i]:
-                dormant_count = dormant_analysis[f'{feature_key}_dormant_users'][0]
-                
-                # Calculate percentage of total dormant users
-                dormant_pct = (dormant_count / overall_dormant * 100) if overall_dormant > 0 else 0
-                
-                alert_level = "high" if dormant_pct > 30 else "medium" if dormant_pct > 15 else "low"
-                additional_insight = f"High {feature_name.lower()} churn" if dormant_pct > 30 else f"Moderate {feature_name.lower()} churn" if dormant_pct > 15 else f"Low {feature_name.lower()} churn"
-                
-                feature_html = create_metric_card(
-                    f"{feature_name} Dormant Users",
-                    f"{dormant_count:,}",
-                    f"{dormant_pct:.1f}% of total dormant users",
-                    color,
-                    icon,
-                    alert_level=alert_level,
-                    additional_insight=additional_insight
-                )
-                components.html(feature_html, height=200)
+
+        # Per-feature dormant counts and their share of all dormant users, computed once
+        # for the cards, the recommendations and the breakdown table
+        dormant_counts = np.array(
+            [dormant_analysis[f'{feature_key}_dormant_users'] for feature_key, _, _, _ in features_data], dtype=np.int64
+        )
+        dormant_pcts = (
+            dormant_counts * (100.0 / overall_dormant) if overall_dormant > 0 else np.zeros(len(dormant_counts))
+        ).tolist()
+        dormant_counts = dormant_counts.tolist()
+
+        feature_cards = []
+        for (feature_key, feature_name, color, icon), dormant_count, dormant_pct in zip(
+            features_data, dormant_counts, dormant_pcts
+        ):
+            alert_level = "high" if dormant_pct > 30 else "medium" if dormant_pct > 15 else "low"
+            additional_insight = f"High {feature_name.lower()} churn" if dormant_pct > 30 else f"Moderate {feature_name.lower()} churn" if dormant_pct > 15 else f"Low {feature_name.lower()} churn"
+
+            feature_html = create_metric_card(
+                f"{feature_name} Dormant Users",
+                f"{dormant_count:,}",
+                f"{dormant_pct:.1f}% of total dormant users",
+                color,
+                icon,
+                alert_level=alert_level,
+                additional_insight=additional_insight
+            )
+            feature_cards.append(feature_html)
+        render_metric_row(feature_cards)
 
         # Dormant Users Trend Analysis
         st.subheader("📈 Dormant Users Trend Over Time")
         
-        # Fetch trend data
-        dormant_trend = fetch_dormant_users_trend(start_date, end_date, dormant_period_days)
-        
         if not dormant_trend.empty:
-            # Create trend chart
-            fig_trend = px.line(
-                dormant_trend,
-                x="activity_date",
-                y="dormant_count",
-                title=f"Daily Dormant Users Count ({dormant_period_days}-day lookback)",
-                color_discrete_sequence=[LADDER_COLORS["red"]],
-                markers=True
+            # Create trend chart from graph_objects directly, like the feature trends;
+            # long ranges are thinned with LTTB before serialization
+            trend_x, trend_y = downsample_lttb(
+                dormant_trend["activity_date"].to_numpy(), dormant_trend["dormant_count"].to_numpy()
+            )
+            fig_trend = go.Figure(
+                go.Scatter(
+                    x=trend_x,
+                    y=trend_y,
+                    mode="lines+markers",
+                    name="dormant_count",
+                    line=dict(color=LADDER_COLORS["red"]),
+                )
             )
             fig_trend.update_layout(
+                title=f"Daily Dormant Users Count ({dormant_period_days}-day lookback)",
                 xaxis_title="Date",
                 yaxis_title="Number of Dormant Users",
                 hovermode="x unified",
@@ -2800,7 +2771,8 @@ with tab7:
             
             # Trend insights
             if len(dormant_trend) > 1:
-                trend_change = dormant_trend['dormant_count'].iloc[-1] - dormant_trend['dormant_count'].iloc[0]
+                dormant_counts_over_time = dormant_trend['dormant_count'].to_numpy()
+                trend_change = int(dormant_counts_over_time[-1] - dormant_counts_over_time[0])
                 trend_direction = "increasing" if trend_change > 0 else "decreasing" if trend_change < 0 else "stable"
                 
                 st.info(f"📊 **Trend Insight**: Dormant users are {trend_direction} by {abs(trend_change):,} users over the analysis period.")
@@ -2822,10 +2794,7 @@ with tab7:
             })
         
         # Feature-specific recommendations
-        for feature_key, feature_name, _, _ in features_data:
-            dormant_count = dormant_analysis[f'{feature_key}_dormant_users'][0]
-            dormant_pct = (dormant_count / overall_dormant * 100) if overall_dormant > 0 else 0
-            
+        for (_, feature_name, _, _), dormant_pct in zip(features_data, dormant_pcts):
             if dormant_pct > 25:
                 recommendations.append({
                     "title": f"High {feature_name} Churn",
@@ -2843,16 +2812,7 @@ with tab7:
             })
         
         # Display recommendations
-        for rec in recommendations:
-            st.markdown(
-                create_insight_card(
-                    rec["title"],
-                    rec["insight"],
-                    rec["recommendation"],
-                    rec["icon"]
-                ),
-                unsafe_allow_html=True
-            )
+        render_insight_cards(recommendations)
 
         # Detailed Analysis Table
         with st.expander("📋 Detailed Dormant Users Breakdown", expanded=False):
@@ -2861,49 +2821,66 @@ with tab7:
             # Create detailed breakdown table
             breakdown_data = {
                 'Feature': ['Overall', 'Spending', 'Savings', 'Investment', 'Lady AI'],
-                'Dormant Users': [
-                    dormant_analysis['overall_dormant_users'][0],
-                    dormant_analysis['spending_dormant_users'][0],
-                    dormant_analysis['savings_dormant_users'][0],
-                    dormant_analysis['investment_dormant_users'][0],
-                    dormant_analysis['lady_ai_dormant_users'][0]
-                ],
-                'Percentage of Total Dormant': [
-                    100.0,
-                    (dormant_analysis['spending_dormant_users'][0] / dormant_analysis['overall_dormant_users'][0] * 100) if dormant_analysis['overall_dormant_users'][0] > 0 else 0,
-                    (dormant_analysis['savings_dormant_users'][0] / dormant_analysis['overall_dormant_users'][0] * 100) if dormant_analysis['overall_dormant_users'][0] > 0 else 0,
-                    (dormant_analysis['investment_dormant_users'][0] / dormant_analysis['overall_dormant_users'][0] * 100) if dormant_analysis['overall_dormant_users'][0] > 0 else 0,
-                    (dormant_analysis['lady_ai_dormant_users'][0] / dormant_analysis['overall_dormant_users'][0] * 100) if dormant_analysis['overall_dormant_users'][0] > 0 else 0
-                ]
+                'Dormant Users': [overall_dormant, *dormant_counts],
+                'Percentage of Total Dormant': [100.0, *dormant_pcts],
             }
             
             breakdown_df = pd.DataFrame(breakdown_data)
             breakdown_df['Percentage of Total Dormant'] = breakdown_df['Percentage of Total Dormant'].round(1)
             
-            # Style the dataframe
-            def highlight_dormant_rows(row):
-                if row['Dormant Users'] == max(breakdown_df['Dormant Users']):
-                    return ['background-color: #FFE6E6'] * len(row)
-                elif row['Dormant Users'] > breakdown_df['Dormant Users'].mean():
-                    return ['background-color: #FFF2E6'] * len(row)
-                else:
-                    return [''] * len(row)
+            # Style the dataframe; the max and mean are taken once, not per row
+            def highlight_dormant_rows(df):
+                dormant_users = df['Dormant Users']
+                row_css = np.where(
+                    dormant_users == dormant_users.max(),
+                    'background-color: #FFE6E6',
+                    np.where(dormant_users > dormant_users.mean(), 'background-color: #FFF2E6', ''),
+                )
+                return pd.DataFrame(
+                    np.repeat(row_css[:, None], df.shape[1], axis=1), index=df.index, columns=df.columns
+                )
             
-            styled_breakdown = breakdown_df.style.apply(highlight_dormant_rows, axis=1)
+            styled_breakdown = breakdown_df.style.apply(highlight_dormant_rows, axis=None)
             st.dataframe(styled_breakdown, use_container_width=True)
             
             # Summary insights
-            st.info(f"📊 **Analysis Summary**: {dormant_analysis['overall_dormant_users'][0]:,} users became dormant during the analysis period. "
+            st.info(f"📊 **Analysis Summary**: {dormant_analysis['overall_dormant_users']:,} users became dormant during the analysis period. "
                    f"The feature with the highest dormant user count is {breakdown_df.loc[breakdown_df['Dormant Users'].idxmax(), 'Feature']}.")
 
     else:
         st.warning("No dormant users data available for the selected period and configuration.")
 
-    st.markdown("</div>", unsafe_allow_html=True)
+
+# One bordered container per section stands in for the old feature-section wrapper divs
+with st.container(border=True):
+    if active_section == "📊 Overview":
+        render_overview_tab(start_date, end_date)
+    elif active_section in FEATURE_SECTIONS:
+        feature, feature_name = FEATURE_SECTIONS[active_section]
+        # Each query covers all four features at once, so switching between
+        # feature sections is served from cache; the three are independent
+        all_feature_metrics, all_feature_retention, all_feature_trends = run_parallel(
+            partial(fetch_all_feature_metrics, start_date, end_date),
+            partial(fetch_all_feature_retention, start_date, end_date),
+            partial(fetch_trend_data, start_date, end_date),
+        )
+        render_feature_tab(
+            feature,
+            feature_name,
+            feature_slice(all_feature_metrics, feature),
+            feature_slice(all_feature_retention, feature),
+            split_trend_buckets(all_feature_trends, feature),
+        )
+    elif active_section == "📋 FFP Engagement":
+        render_ffp_tab(start_date, end_date)
+    else:
+        render_dormant_tab(start_date, end_date)
 
 # Footer with summary stats
-st.markdown(
-    f"""
+@st.cache_resource
+def footer_template():
+    """Footer markup with the palette filled in, built once per process; reruns only format in the dates"""
+    return f"""
 <div style="text-align: center; padding: 20px; margin-top: 30px; 
             background: linear-gradient(90deg, {LADDER_COLORS['navy']}, {LADDER_COLORS['purple']}); 
             border-radius: 15px;">
@@ -2911,11 +2888,11 @@ st.markdown(
     <div style="display: flex; justify-content: space-around; flex-wrap: wrap;">
         <div style="color: white; text-align: center; margin: 5px;">
             <div style="font-size: 18px; font-weight: bold;">Period Analyzed</div>
-            <div style="opacity: 0.8;">{start_date} to {end_date}</div>
+            <div style="opacity: 0.8;">{{start_date}} to {{end_date}}</div>
         </div>
         <div style="color: white; text-align: center; margin: 5px;">
             <div style="font-size: 18px; font-weight: bold;">Last Updated</div>
-            <div style="opacity: 0.8;">{datetime.now().strftime('%Y-%m-%d %H:%M')}</div>
+            <div style="opacity: 0.8;">{{updated_at}}</div>
         </div>
         <div style="color: white; text-align: center; margin: 5px;">
             <div style="font-size: 18px; font-weight: bold;">Data Source</div>
@@ -2923,7 +2900,15 @@ st.markdown(
         </div>
     </div>
 </div>
-""",
+"""
+
+
+st.markdown(
+    footer_template().format(
+        start_date=start_date,
+        end_date=end_date,
+        updated_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+    ),
     unsafe_allow_html=True,
 )
 